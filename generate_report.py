@@ -5,198 +5,330 @@ This script generates HTML reports from Maestro test results
 """
 
 import os
+import re
 import sys
 import json
-import glob
 import time
+import shutil
 import argparse
+import threading
 import subprocess
+import concurrent.futures
 from datetime import datetime
+from html import escape
 from pathlib import Path
 
-def run_maestro_test(flow_file, device_id=None):
-    """Run a Maestro test and capture the output"""
-    print(f"Running test: {flow_file}")
-    
-    cmd = ["maestro", "test", flow_file]
-    if device_id:
-        cmd.extend(["--device", device_id])
-    
-    start_time = time.time()
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    end_time = time.time()
-    
-    return {
-        "flow_file": flow_file,
-        "success": result.returncode == 0,
-        "output": result.stdout,
-        "error": result.stderr,
-        "duration": end_time - start_time
-    }
+# Optional: orjson serializes results several times faster than json
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj).encode("utf-8")
+    _loads = json.loads
 
-def parse_test_results(test_results):
-    """Parse test results to extract key information"""
-    parsed_results = []
-    
-    for result in test_results:
-        # Extract screenshots
-        screenshots = []
-        for line in result["output"].splitlines():
-            if "Screenshot saved to" in line:
-                screenshot_path = line.split("Screenshot saved to")[-1].strip()
-                if os.path.exists(screenshot_path):
-                    screenshots.append(screenshot_path)
-        
-        # Extract errors
-        errors = []
-        if not result["success"]:
-            for line in result["error"].splitlines():
-                if "Error:" in line or "Failed:" in line:
-                    errors.append(line.strip())
-        
-        # Extract app package
-        app_package = "Unknown"
-        for line in result["output"].splitlines():
-            if "appId:" in line:
-                app_package = line.split("appId:")[-1].strip()
-                break
-        
-        parsed_results.append({
-            "flow_file": result["flow_file"],
-            "app_package": app_package,
-            "success": result["success"],
-            "duration": result["duration"],
-            "screenshots": screenshots,
-            "errors": errors
-        })
-    
-    return parsed_results
+# Parsed results of the last --run, kept next to the reports
+RESULTS_CACHE_FILE = "results.json"
 
-def generate_html_report(parsed_results, output_dir):
-    """Generate an HTML report from parsed test results"""
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    report_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    report_file = os.path.join(output_dir, f"report_{int(time.time())}.html")
-    
-    # Copy screenshots to report directory
-    screenshot_dir = os.path.join(output_dir, "screenshots")
-    if not os.path.exists(screenshot_dir):
-        os.makedirs(screenshot_dir)
-    
-    for result in parsed_results:
-        for i, screenshot in enumerate(result["screenshots"]):
-            test_name = os.path.basename(result["flow_file"]).replace(".yaml", "")
-            new_screenshot = os.path.join(
-                screenshot_dir, 
-                f"{test_name}_screenshot_{i+1}.png"
-            )
-            try:
-                with open(screenshot, "rb") as src, open(new_screenshot, "wb") as dst:
-                    dst.write(src.read())
-                # Update path in results
-                result["screenshots"][i] = os.path.relpath(new_screenshot, output_dir)
-            except Exception as e:
-                print(f"Error copying screenshot: {e}")
-    
-    # Calculate summary statistics
-    total_tests = len(parsed_results)
-    passed_tests = sum(1 for r in parsed_results if r["success"])
-    failed_tests = total_tests - passed_tests
-    success_rate = (passed_tests / total_tests) * 100 if total_tests > 0 else 0
-    total_duration = sum(r["duration"] for r in parsed_results)
-    
-    # Generate HTML
-    html = f"""<!DOCTYPE html>
+# Static start of the report document, written verbatim ahead of the
+# per-report values
+_REPORT_HEAD = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>NexusControl - Maestro Test Report</title>
     <style>
-        body {{
+        body {
             font-family: Arial, sans-serif;
             line-height: 1.6;
             margin: 0;
             padding: 20px;
             color: #333;
-        }}
-        h1, h2, h3 {{
+        }
+        h1, h2, h3 {
             color: #2c3e50;
-        }}
-        .header {{
+        }
+        .header {
             background-color: #3498db;
             color: white;
             padding: 20px;
             border-radius: 5px;
             margin-bottom: 20px;
-        }}
-        .summary {{
+        }
+        .summary {
             display: flex;
             justify-content: space-between;
             background-color: #f8f9fa;
             padding: 15px;
             border-radius: 5px;
             margin-bottom: 20px;
-        }}
-        .summary-item {{
+        }
+        .summary-item {
             text-align: center;
-        }}
-        .summary-value {{
+        }
+        .summary-value {
             font-size: 24px;
             font-weight: bold;
-        }}
-        .test-card {{
+        }
+        .test-card {
             border: 1px solid #ddd;
             border-radius: 5px;
             padding: 15px;
             margin-bottom: 15px;
-        }}
-        .test-header {{
+        }
+        .test-header {
             display: flex;
             justify-content: space-between;
             align-items: center;
             margin-bottom: 10px;
-        }}
-        .test-title {{
+        }
+        .test-title {
             font-size: 18px;
             font-weight: bold;
-        }}
-        .success {{
+        }
+        .success {
             color: #27ae60;
-        }}
-        .failure {{
+        }
+        .failure {
             color: #e74c3c;
-        }}
-        .screenshots {{
+        }
+        .screenshots {
             display: flex;
             flex-wrap: wrap;
             gap: 10px;
             margin-top: 10px;
-        }}
-        .screenshot {{
+        }
+        .screenshot {
             max-width: 200px;
             border: 1px solid #ddd;
             border-radius: 3px;
-        }}
-        .error-list {{
+        }
+        .error-list {
             background-color: #ffecec;
             border-left: 4px solid #e74c3c;
             padding: 10px;
             margin-top: 10px;
-        }}
-        .progress-bar {{
+        }
+        .progress-bar {
             height: 20px;
             background-color: #ecf0f1;
             border-radius: 10px;
             margin-bottom: 20px;
-        }}
-        .progress {{
+        }
+        .progress {
             height: 100%;
             background-color: #27ae60;
             border-radius: 10px;
-            width: {success_rate}%;
+"""
+
+def _test_name(flow_file):
+    """Return the flow file name without its .yaml suffix"""
+    name = os.path.basename(flow_file)
+    # Only a trailing suffix is stripped (str.removesuffix needs Python 3.9)
+    return name[:-len(".yaml")] if name.endswith(".yaml") else name
+
+# Maestro output markers, matched in a single pass over each output
+_OUT_RE = re.compile(r"Screenshot saved to(?P<shot>[^\n]*)|appId:(?P<app>[^\n]*)")
+_ERR_RE = re.compile(r"^[^\n]*(?:Error|Failed):[^\n]*$", re.MULTILINE)
+
+# Authorized entries in `adb devices` output
+_DEVICE_RE = re.compile(r"^(\S+)\tdevice(?:\s|$)", re.MULTILINE)
+
+def _scan_output(text, screenshots, app_package=None):
+    """Collect screenshot paths from Maestro output and return the first appId"""
+    for m in _OUT_RE.finditer(text):
+        shot = m.group("shot")
+        if shot is not None:
+            screenshots.append(shot.strip())
+        elif app_package is None:
+            app_package = m.group("app").strip()
+    return app_package
+
+def run_maestro_test(flow_file, device_id=None):
+    """Run a Maestro test, parsing its output while it streams"""
+    print(f"Running test: {flow_file}")
+    
+    cmd = ["maestro", "test", flow_file]
+    if device_id:
+        cmd.extend(["--device", device_id])
+    
+    start_time = time.time()
+    # The context manager closes the pipes and reaps the child on every path
+    with subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1
+    ) as process:
+        # Drain stderr in the background so a chatty child can't block on it
+        error_chunks = []
+        stderr_reader = threading.Thread(target=lambda: error_chunks.append(process.stderr.read()))
+        stderr_reader.start()
+        
+        # Stdout is parsed line by line rather than kept in memory
+        screenshots = []
+        app_package = None
+        try:
+            for line in process.stdout:
+                app_package = _scan_output(line, screenshots, app_package)
+        finally:
+            stderr_reader.join()
+    end_time = time.time()
+    
+    return {
+        "flow_file": flow_file,
+        "success": process.returncode == 0,
+        "screenshots": screenshots,
+        "app_package": app_package,
+        "error": "".join(error_chunks),
+        "duration": end_time - start_time
+    }
+
+def get_connected_devices():
+    """Return the serials of authorized devices reported by `adb devices`"""
+    try:
+        result = subprocess.run(["adb", "devices"], capture_output=True, text=True)
+    except (OSError, subprocess.SubprocessError):
+        return []
+    return _DEVICE_RE.findall(result.stdout)
+
+def run_maestro_tests(flow_files, devices):
+    """Run flows sharded across devices, one test at a time per device"""
+    if len(devices) <= 1:
+        device_id = devices[0] if devices else None
+        return [run_maestro_test(flow_file, device_id) for flow_file in flow_files]
+    
+    def run_shard(shard, device_id):
+        return [run_maestro_test(flow_file, device_id) for flow_file in shard]
+    
+    # Each worker owns one device and runs its share of the flows sequentially
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(devices)) as executor:
+        futures = [
+            executor.submit(run_shard, flow_files[i::len(devices)], device_id)
+            for i, device_id in enumerate(devices)
+        ]
+        results = {r["flow_file"]: r for f in futures for r in f.result()}
+    
+    # Report in the original flow order
+    return [results[flow_file] for flow_file in flow_files]
+
+def _path_exists(path, dir_cache):
+    """Check a path against a cached listing of its directory"""
+    directory, name = os.path.split(path)
+    directory = directory or "."
+    if directory not in dir_cache:
+        try:
+            with os.scandir(directory) as entries:
+                dir_cache[directory] = {entry.name for entry in entries}
+        except FileNotFoundError:
+            dir_cache[directory] = set()
+        except OSError:
+            # Unlistable directory: fall back to a single stat
+            dir_cache[directory] = None
+    names = dir_cache[directory]
+    if names is None:
+        return os.path.exists(path)
+    return name in names
+
+def parse_test_results(test_results):
+    """Parse test results to extract key information"""
+    parsed_results = []
+    # One directory listing per screenshot directory instead of a stat per file
+    dir_cache = {}
+    
+    for result in test_results:
+        # Results from run_maestro_test were already parsed while streaming
+        if "screenshots" in result:
+            candidates = result["screenshots"]
+            app_package = result["app_package"]
+        else:
+            candidates = []
+            app_package = _scan_output(result["output"], candidates)
+        screenshots = [path for path in candidates if _path_exists(path, dir_cache)]
+        if app_package is None:
+            app_package = "Unknown"
+        
+        # Extract errors
+        success = result["success"]
+        errors = []
+        if not success:
+            errors = [m.group().strip() for m in _ERR_RE.finditer(result["error"])]
+        
+        parsed_results.append({
+            "flow_file": result["flow_file"],
+            "app_package": app_package,
+            "success": success,
+            "duration": result["duration"],
+            "screenshots": screenshots,
+            "errors": errors
+        })
+    
+    return parsed_results
+
+def save_results(parsed_results, cache_file):
+    """Persist parsed test results so the report can be rebuilt without rerunning"""
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    with open(cache_file, "wb") as f:
+        f.write(_dumps(parsed_results))
+
+def load_cached_results(cache_file, flow_files):
+    """Load cached results if they are newer than every flow file, else None"""
+    try:
+        cache_mtime = os.stat(cache_file).st_mtime
+        if any(os.stat(flow_file).st_mtime > cache_mtime for flow_file in flow_files):
+            return None
+        with open(cache_file, "rb") as f:
+            return _loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+def generate_html_report(parsed_results, output_dir):
+    """Generate an HTML report from parsed test results"""
+    os.makedirs(output_dir, exist_ok=True)
+    
+    report_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    report_file = os.path.join(output_dir, f"report_{int(time.time())}.html")
+    
+    # Copy screenshots to report directory
+    screenshot_dir = os.path.join(output_dir, "screenshots")
+    os.makedirs(screenshot_dir, exist_ok=True)
+    
+    copy_tasks = []
+    for result in parsed_results:
+        test_name = _test_name(result["flow_file"])
+        screenshots = result["screenshots"]
+        for i, screenshot in enumerate(screenshots):
+            new_screenshot = os.path.join(
+                screenshot_dir, 
+                f"{test_name}_screenshot_{i+1}.png"
+            )
+            copy_tasks.append((screenshots, i, screenshot, new_screenshot))
+    
+    def copy_screenshot(task):
+        screenshots, i, screenshot, new_screenshot = task
+        try:
+            # Copied by the kernel (sendfile) where available, never read whole into memory
+            shutil.copyfile(screenshot, new_screenshot)
+            # Update path in results
+            screenshots[i] = os.path.relpath(new_screenshot, output_dir)
+        except Exception as e:
+            print(f"Error copying screenshot: {e}")
+    
+    # Copies are I/O bound, so overlap them on a small thread pool
+    if copy_tasks:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(copy_tasks))) as executor:
+            list(executor.map(copy_screenshot, copy_tasks))
+    
+    # Calculate summary statistics
+    total_tests = len(parsed_results)
+    passed_tests = sum(1 for r in parsed_results if r["success"])
+    failed_tests = total_tests - passed_tests
+    success_rate = (passed_tests / total_tests) * 100 if total_tests > 0 else 0
+    total_duration = sum(r["duration"] for r in parsed_results)
+    
+    # Write the report straight to disk, fragment by fragment
+    with open(report_file, "w", buffering=1 << 20) as f:
+        f.write(_REPORT_HEAD)
+        f.write(f"""            width: {success_rate}%;
         }}
     </style>
 </head>
@@ -234,71 +366,71 @@ def generate_html_report(parsed_results, output_dir):
     </div>
     
     <h2>Test Results</h2>
-"""
+""")
     
-    # Add test results
-    for result in parsed_results:
-        test_name = os.path.basename(result["flow_file"]).replace(".yaml", "")
-        status_class = "success" if result["success"] else "failure"
-        status_text = "PASSED" if result["success"] else "FAILED"
-        
-        html += f"""
+        # Add test results
+        for result in parsed_results:
+            success = result["success"]
+            screenshots = result["screenshots"]
+            errors = result["errors"]
+            test_name = escape(_test_name(result["flow_file"]))
+            status_class = "success" if success else "failure"
+            status_text = "PASSED" if success else "FAILED"
+            
+            f.write(f"""
     <div class="test-card">
         <div class="test-header">
             <div class="test-title">{test_name}</div>
             <div class="{status_class}">{status_text}</div>
         </div>
         <div>
-            <strong>App Package:</strong> {result["app_package"]}
+            <strong>App Package:</strong> {escape(str(result["app_package"]))}
         </div>
         <div>
             <strong>Duration:</strong> {result["duration"]:.2f} seconds
         </div>
-"""
-        
-        if result["screenshots"]:
-            html += f"""
+""")
+            
+            if screenshots:
+                f.write(f"""
         <div>
             <strong>Screenshots:</strong>
             <div class="screenshots">
-"""
-            for screenshot in result["screenshots"]:
-                html += f"""
-                <img src="{screenshot}" class="screenshot" alt="Test Screenshot">
-"""
-            html += """
+""")
+                for screenshot in screenshots:
+                    f.write(f"""
+                <img src="{escape(screenshot)}" class="screenshot" alt="Test Screenshot">
+""")
+                f.write("""
             </div>
         </div>
-"""
-        
-        if result["errors"]:
-            html += f"""
+""")
+            
+            if errors:
+                f.write(f"""
         <div>
             <strong>Errors:</strong>
             <div class="error-list">
                 <ul>
-"""
-            for error in result["errors"]:
-                html += f"""
-                    <li>{error}</li>
-"""
-            html += """
+""")
+                for error in errors:
+                    f.write(f"""
+                    <li>{escape(error)}</li>
+""")
+                f.write("""
                 </ul>
             </div>
         </div>
-"""
-        
-        html += """
+""")
+            
+            f.write("""
     </div>
-"""
-    
-    html += """
+""")
+        
+        f.write("""
 </body>
 </html>
-"""
-    
-    with open(report_file, "w") as f:
-        f.write(html)
+""")
     
     print(f"Report generated: {report_file}")
     return report_file
@@ -318,31 +450,45 @@ def main():
         return 1
     
     # Get flow files
-    flow_files = glob.glob(os.path.join(args.flows, "*.yaml"))
+    with os.scandir(args.flows) as entries:
+        # Like glob's "*.yaml", hidden files are skipped
+        flow_files = [
+            e.path for e in entries
+            if e.name.endswith(".yaml") and not e.name.startswith(".") and e.is_file()
+        ]
     if not flow_files:
         print(f"Error: No flow files found in '{args.flows}'")
         return 1
     
     test_results = []
+    results_cache = os.path.join(args.output, RESULTS_CACHE_FILE)
+    parsed_results = None
     
     if args.run:
-        # Run tests
-        for flow_file in flow_files:
-            result = run_maestro_test(flow_file, args.device)
-            test_results.append(result)
+        # Run tests, in parallel when several devices are connected
+        devices = [args.device] if args.device else get_connected_devices()
+        test_results = run_maestro_tests(flow_files, devices)
     else:
-        # Simulate test results for demonstration
-        for flow_file in flow_files:
-            test_results.append({
-                "flow_file": flow_file,
-                "success": True,
-                "output": f"Running flow: {flow_file}\nappId: com.example.app\nScreenshot saved to /tmp/screenshot.png",
-                "error": "",
-                "duration": 5.0
-            })
+        # Reuse the results of the last run while the flows are unchanged
+        parsed_results = load_cached_results(results_cache, flow_files)
+        if parsed_results is not None:
+            print(f"Using cached results: {results_cache}")
+        else:
+            # Simulate test results for demonstration
+            for flow_file in flow_files:
+                test_results.append({
+                    "flow_file": flow_file,
+                    "success": True,
+                    "output": f"Running flow: {flow_file}\nappId: com.example.app\nScreenshot saved to /tmp/screenshot.png",
+                    "error": "",
+                    "duration": 5.0
+                })
     
-    # Parse results
-    parsed_results = parse_test_results(test_results)
+    if parsed_results is None:
+        # Parse results
+        parsed_results = parse_test_results(test_results)
+        if args.run:
+            save_results(parsed_results, results_cache)
     
     # Generate report
     report_file = generate_html_report(parsed_results, args.output)
@@ -3,11 +3,32 @@ Configuration constants for the Android MCP.
 """
 
 import os
+import logging
 
 # Directory configuration
 MAESTRO_FLOWS_DIR = 'maestro_flows'
 CURRENT_MAESTRO_FLOW_FILE = os.path.join(MAESTRO_FLOWS_DIR, 'current_flow.yaml')
 
+def _env_number(name, default, cast):
+    """Read a numeric setting from the environment, keeping the default if it is invalid."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        logging.getLogger(__name__).warning(f"Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+# Maximum number of devices queried concurrently; adb can fail under heavy parallel load
+DEVICE_THREADS = max(1, _env_number('ANDROID_MCP_DEVICE_THREADS', 8, int))
+
+# Seconds an adb command may take before it is treated as hung
+ADB_TIMEOUT = _env_number('ANDROID_MCP_ADB_TIMEOUT', 15.0, float)
+
+# Opt in to UI dumps through a uiautomator2 agent, which it installs and keeps running on the device
+USE_UIAUTOMATOR2 = os.environ.get('ANDROID_MCP_UIAUTOMATOR2', '').lower() in ('1', 'true', 'yes')
+
 # Ensure Maestro flows directory exists
 os.makedirs(MAESTRO_FLOWS_DIR, exist_ok=True)
 
@@ -36,10 +57,13 @@ KEYCODES = {
 CONSTANTS = {
     # ADB commands
     'ADB_COMMAND': 'adb',
-    'DEVICE_FLAG': '--device',
+    'DEVICE_FLAG': '-s',
     'SHELL_COMMAND': 'shell',
     'PULL_COMMAND': 'pull',
     'PUSH_COMMAND': 'push',
+    # push/pull compression (-z), used with platform-tools 34 or newer
+    'TRANSFER_COMPRESSION': 'brotli',
+    'TRANSFER_COMPRESSION_MIN_ADB': 34,
     'INSTALL_COMMAND': 'install',
     'UNINSTALL_COMMAND': 'uninstall',
     'LOGCAT_COMMAND': 'logcat',
@@ -8,16 +8,103 @@ import subprocess
 import sys
 import time
 import re
-import json
-import base64
+import functools
+import itertools
+import shlex
+import shutil
+import tempfile
 import threading
-import traceback
-from typing import Dict, List, Any, Optional, Tuple, Union
-from datetime import datetime
-from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from datetime import date
+
+from .config import ADB_TIMEOUT, CONSTANTS, DEVICE_THREADS, BATTERY_STATUS_MAP, MAESTRO_FLOWS_DIR, CURRENT_MAESTRO_FLOW_FILE
+from .utils import run_command, ensure_directory_exists, input_text_command, logger
+
+# Sentinel echoed after every command sent to a persistent adb shell session
+_SHELL_SENTINEL = "__NEXUS_END_"
+_SHELL_SENTINEL_RE = re.compile(rb"__NEXUS_END_(\d+)__")
+
+# Leading bytes of every PNG file
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Matches authorized entries in `adb devices` output
+_DEVICE_RE = re.compile(r"^(\S+)\tdevice(?:\s|$)", re.MULTILINE)
+
+# `adb devices -l` pads with spaces and appends key:value details
+_DEVICE_LONG_RE = re.compile(r"^(\S+)[ \t]+device(?:[ \t]+(.*))?$", re.MULTILINE)
+_MODEL_RE = re.compile(r"\bmodel:(\S+)")
+
+# Batched shell script used by get_device_info; sections are split on the separator
+_DEVICE_INFO_SEPARATOR = "---"
+_DEVICE_INFO_SCRIPT = f"; echo {_DEVICE_INFO_SEPARATOR}; ".join([
+    "getprop ro.product.model",
+    "getprop ro.product.manufacturer",
+    "getprop ro.build.version.release",
+    "getprop ro.build.version.sdk",
+    "dumpsys battery",
+    "wm size",
+    f"{CONSTANTS['IP_ADDR_COMMAND']} {CONSTANTS['WIFI_INTERFACE']} 2>/dev/null",
+])
+_DEVICE_INFO_SEPARATOR_BYTES = _DEVICE_INFO_SEPARATOR.encode()
+_DEVICE_INFO_SECTIONS = 7
+_BATTERY_LEVEL_RE = re.compile(rb"level:\s*(\d+)")
+_BATTERY_STATUS_RE = re.compile(CONSTANTS['BATTERY_STATUS_REGEX'].encode())
+_SCREEN_SIZE_RE = re.compile(CONSTANTS['SCREEN_SIZE_REGEX'].encode())
+_IP_ADDRESS_RE = re.compile(CONSTANTS['IP_ADDRESS_REGEX'].encode())
+
+# `pm list packages` lines and `getprop` "[key]: [value]" pairs
+_PACKAGE_LINE_RE = re.compile(r"^package:(\S+)", re.MULTILINE)
+_GETPROP_RE = re.compile(r"^\[([^\]]+)\]:[ \t]+\[([^\]]*)\]", re.MULTILINE)
+
+# Platform-tools release line of `adb version`, e.g. "Version 34.0.4-10411341"
+_ADB_RELEASE_RE = re.compile(r"^Version (\d+)\.", re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=1)
+def _adb_version_output(adb: str = CONSTANTS['ADB_COMMAND']) -> Optional[str]:
+    """Run ``adb version`` once per process and return its output, or None on failure."""
+    try:
+        result = subprocess.run([adb, "version"], capture_output=True, text=True, check=True,
+                                timeout=ADB_TIMEOUT)
+        return result.stdout
+    except (subprocess.SubprocessError, FileNotFoundError):
+        return None
+
+
+def _adb_available(adb: str = CONSTANTS['ADB_COMMAND']) -> bool:
+    """Report whether ``adb version`` succeeded."""
+    output = _adb_version_output(adb)
+    if output is None:
+        return False
+    first_line = output.partition("\n")[0]
+    logger.info(f"ADB is installed: {first_line}")
+    return True
+
+
+@functools.lru_cache(maxsize=1)
+def _adb_supports_compression(adb: str = CONSTANTS['ADB_COMMAND']) -> bool:
+    """Report whether the platform-tools release is new enough for ``push/pull -z``."""
+    match = _ADB_RELEASE_RE.search(_adb_version_output(adb) or "")
+    return bool(match) and int(match.group(1)) >= CONSTANTS['TRANSFER_COMPRESSION_MIN_ADB']
+
+
+@functools.lru_cache(maxsize=1)
+def _maestro_available(maestro: str = CONSTANTS['MAESTRO_COMMAND']) -> bool:
+    """Run ``maestro --version`` once per process and report whether it succeeded."""
+    try:
+        stdout, stderr, return_code = run_command([maestro, '--version'])
+    except FileNotFoundError:
+        logger.warning("Maestro is not installed or not in PATH")
+        return False
+    
+    if return_code != 0:
+        logger.warning("Maestro command failed")
+        return False
+    
+    logger.info(f"Maestro is installed and accessible: {stdout.strip()}")
+    return True
 
-from .config import CONSTANTS, DEVICE_INFO_KEYS, BATTERY_STATUS_MAP, MAESTRO_FLOWS_DIR, CURRENT_MAESTRO_FLOW_FILE
-from .utils import run_command, generate_timestamp_filename, extract_regex_match, ensure_directory_exists, logger
 
 class AndroidController:
     """
@@ -26,120 +113,235 @@ class AndroidController:
     """
     
     def __init__(self):
-        """Initialize the controller and check for ADB."""
-        self.check_adb_installed()
+        """
+        Initialize the controller.
+        
+        Nothing is executed here: the ADB check runs on the first adb call and
+        the Maestro flow file is set up on the first flow operation.
+        """
+        # Resolve executables once instead of walking PATH on every exec
+        self._adb = shutil.which(CONSTANTS['ADB_COMMAND']) or CONSTANTS['ADB_COMMAND']
+        self._maestro = shutil.which(CONSTANTS['MAESTRO_COMMAND']) or CONSTANTS['MAESTRO_COMMAND']
+        self._adb_checked: Optional[bool] = None
         self.device_cache = {}
-        self.maestro_flow = ""
+        self._cache_lock = threading.Lock()
+        self._device_prefix: Dict[str, Tuple[str, str, str]] = {}
+        self._shells: Dict[str, subprocess.Popen] = {}
+        self._shell_locks: Dict[str, threading.Lock] = {}
+        self._record_counter = itertools.count()
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        self._shot_counter = itertools.count()
+        self._shot_date: Optional[date] = None
+        self._shot_day = ""
+        self._flow_parts: List[str] = []
+        self._flow_tmp = None
+        self._flow_initialized = False
+        self._maestro_dir_ready = False
         logger.info("AndroidController initialized")
         self.current_maestro_flow_file = CURRENT_MAESTRO_FLOW_FILE
-        ensure_directory_exists(MAESTRO_FLOWS_DIR)
-        self.clear_maestro_flow()
+    
+    @property
+    def _adb_ok(self) -> bool:
+        """Result of the ADB check, evaluated on first use."""
+        if self._adb_checked is None:
+            self._adb_checked = self.check_adb_installed()
+        return self._adb_checked
     
     def check_adb_installed(self):
-        """Check if ADB is installed and accessible."""
-        try:
-            result = subprocess.run(["adb", "version"], capture_output=True, text=True, check=True)
-            logger.info(f"ADB is installed: {result.stdout.splitlines()[0]}")
+        """Check if ADB is installed and accessible (the probe runs once per process)."""
+        if _adb_available(self._adb):
             return True
-        except (subprocess.SubprocessError, FileNotFoundError):
-            logger.error("ADB is not installed or not in PATH")
-            print("❌ ADB is not installed or not in PATH.")
-            print("Please install ADB and make sure it's in your PATH.")
-            return False
+        
+        logger.error("ADB is not installed or not in PATH")
+        print("❌ ADB is not installed or not in PATH.")
+        print("Please install ADB and make sure it's in your PATH.")
+        return False
     
     def get_devices(self):
         """Get list of connected devices."""
         logger.info("Getting connected devices")
-        result = subprocess.run(["adb", "devices"], capture_output=True, text=True, check=True)
-        lines = result.stdout.strip().split('\n')[1:]  # Skip the first line (header)
-        
-        devices = []
-        for line in lines:
-            if line.strip():
-                parts = line.split('\t')
-                if len(parts) >= 2:
-                    device_id = parts[0].strip()
-                    status = parts[1].strip()
-                    if status == "device":  # Only include authorized devices
-                        devices.append(device_id)
+        self._adb_ok
+        result = subprocess.run([self._adb, "devices"], capture_output=True, text=True, check=True,
+                                timeout=ADB_TIMEOUT)
+        
+        # Only "<serial>\tdevice" lines are authorized devices; the header and
+        # offline/unauthorized entries never match
+        devices = _DEVICE_RE.findall(result.stdout)
         
         logger.info(f"Found {len(devices)} device(s): {devices}")
         return devices
     
+    def get_device_models(self) -> Dict[str, Optional[str]]:
+        """
+        Get connected devices with their model names from one ``adb devices -l``.
+        
+        Returns:
+            Mapping of device serial to its model (as reported by adb, with
+            spaces replaced by underscores), or None when adb omits it.
+        """
+        logger.info("Getting connected devices with models")
+        self._adb_ok
+        result = subprocess.run([self._adb, "devices", "-l"], capture_output=True, text=True, check=True,
+                                timeout=ADB_TIMEOUT)
+        
+        models = {}
+        for device_id, details in _DEVICE_LONG_RE.findall(result.stdout):
+            match = _MODEL_RE.search(details)
+            models[device_id] = match.group(1) if match else None
+        return models
+    
     def get_device_info(self, device_id, force_refresh=False):
         """Get comprehensive information about a device."""
         logger.info(f"Getting device info for {device_id}")
         
-        if device_id in self.device_cache and not force_refresh:
-            return self.device_cache[device_id]
+        with self._cache_lock:
+            if not force_refresh and device_id in self.device_cache:
+                return self.device_cache[device_id]
             
         info = {}
         
-        # Get device model
-        result = subprocess.run(
-            ["adb", "-s", device_id, "shell", "getprop", "ro.product.model"],
-            capture_output=True, text=True, check=False
-        )
-        info["model"] = result.stdout.strip()
-        
-        # Get Android version
-        result = subprocess.run(
-            ["adb", "-s", device_id, "shell", "getprop", "ro.build.version.release"],
-            capture_output=True, text=True, check=False
-        )
-        info["android_version"] = result.stdout.strip()
+        # Query props, battery, screen size and Wi-Fi address in a single round trip
+        result = self._run_adb_shell_bytes(device_id, _DEVICE_INFO_SCRIPT)
+        # Split on separator lines; splitlines() also copes with the CRLF
+        # endings of a pty-backed fallback shell
+        sections = [[]]
+        for line in result.splitlines():
+            if line.strip() == _DEVICE_INFO_SEPARATOR_BYTES:
+                sections.append([])
+            else:
+                sections[-1].append(line)
+        sections = [b"\n".join(lines) for lines in sections]
+        sections += [b""] * (_DEVICE_INFO_SECTIONS - len(sections))
+        model, manufacturer, release, sdk, battery, screen, ip_addr = sections[:_DEVICE_INFO_SECTIONS]
         
-        # Get battery level
-        result = subprocess.run(
-            ["adb", "-s", device_id, "shell", "dumpsys", "battery", "|", "grep", "level"],
-            capture_output=True, text=True, shell=True, check=False
+        info["model"] = model.strip().decode(errors="replace")
+        info["manufacturer"] = manufacturer.strip().decode(errors="replace")
+        info["android_version"] = release.strip().decode(errors="replace")
+        info["api_level"] = sdk.strip().decode(errors="replace")
+        # Parse dumpsys/wm/ip output locally instead of piping through grep on the device
+        match = _BATTERY_LEVEL_RE.search(battery)
+        info["battery_level"] = match.group(1).decode() if match else "Unknown"
+        match = _BATTERY_STATUS_RE.search(battery)
+        info["battery_status"] = (
+            BATTERY_STATUS_MAP.get(int(match.group(1)), "Unknown") if match else "Unknown"
         )
-        try:
-            info["battery_level"] = result.stdout.strip().split(": ")[1]
-        except (IndexError, ValueError):
-            info["battery_level"] = "Unknown"
+        match = _SCREEN_SIZE_RE.search(screen)
+        info["screen_resolution"] = match.group(1).decode() if match else "Unknown"
+        match = _IP_ADDRESS_RE.search(ip_addr)
+        info["ip_address"] = match.group(1).decode() if match else "Unknown"
         
-        # Cache the info
-        self.device_cache[device_id] = info
+        # An empty reply means the device did not answer; do not keep that around
+        if result.strip():
+            with self._cache_lock:
+                self.device_cache[device_id] = info
         return info
     
+    def get_devices_info(self, device_ids: List[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Get device info for several devices concurrently.
+        
+        Each lookup is bound on adb round trips, so they are overlapped on a
+        pool capped by DEVICE_THREADS instead of run one by one.
+        
+        Args:
+            device_ids: The device IDs to query.
+            
+        Returns:
+            Mapping of device ID to its info (None if the lookup failed), in
+            the order given.
+        """
+        def lookup(device_id):
+            try:
+                return self.get_device_info(device_id)
+            except Exception as e:
+                logger.error(f"Error getting device info for {device_id}: {str(e)}")
+                return None
+        
+        if not device_ids:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(len(device_ids), DEVICE_THREADS)) as executor:
+            return dict(zip(device_ids, executor.map(lookup, device_ids)))
+    
     def take_screenshot(self, device_id, output_path=None):
         """Take a screenshot on the device."""
         logger.info(f"Taking screenshot on device {device_id}")
         
         if not output_path:
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            output_path = f"screenshot_{device_id}_{timestamp}.png"
+            output_path = self._next_screenshot_path(device_id)
             
-        # Take screenshot on device
-        subprocess.run(
-            ["adb", "-s", device_id, "shell", "screencap", "-p", "/data/local/tmp/screenshot.png"],
-            check=True
-        )
-        
-        # Pull screenshot to computer
-        subprocess.run(
-            ["adb", "-s", device_id, "pull", "/data/local/tmp/screenshot.png", output_path],
-            check=True
-        )
-        
-        # Remove screenshot from device
-        subprocess.run(
-            ["adb", "-s", device_id, "shell", "rm", "/data/local/tmp/screenshot.png"],
-            check=True
-        )
+        # Stream the PNG straight over the adb transport, no file on the device.
+        # exec-out drops the remote exit status, so check the data is a PNG
+        # before anything is written locally.
+        image_data = self.exec_out(device_id, "screencap -p")
+        if not image_data.startswith(_PNG_SIGNATURE):
+            raise subprocess.SubprocessError(f"screencap returned no PNG data for {device_id}")
+        with open(output_path, "wb") as f:
+            f.write(image_data)
         
         logger.info(f"Screenshot saved to {output_path}")
         return output_path
     
+    def _next_screenshot_path(self, device_id: str) -> str:
+        """
+        Generate a unique default screenshot filename.
+        
+        Names are ``screenshot_<device>_<YYYYMMDD>_<counter>.png``; the date
+        prefix is only re-formatted when the day changes, and the counter
+        guarantees that two screenshots in the same second do not collide.
+        
+        Args:
+            device_id: The device ID/serial.
+            
+        Returns:
+            A filename that does not exist yet.
+        """
+        today = date.today()
+        if today != self._shot_date:
+            self._shot_date = today
+            self._shot_day = today.strftime("%Y%m%d")
+        
+        while True:
+            path = f"screenshot_{device_id}_{self._shot_day}_{next(self._shot_counter):06d}.png"
+            if not os.path.exists(path):
+                return path
+    
     # Maestro integration methods
+    @property
+    def maestro_flow(self) -> str:
+        """The current Maestro flow as YAML text."""
+        return "".join(self._flow_parts)
+    
+    @maestro_flow.setter
+    def maestro_flow(self, value: str) -> None:
+        self._flow_parts = [value] if value else []
+        # An explicitly set flow must not be reset by the lazy setup
+        self._flow_initialized = True
+    
+    def _write_flow_file(self):
+        """Create the flows directory if needed and write an empty flow file."""
+        if not self._maestro_dir_ready:
+            ensure_directory_exists(MAESTRO_FLOWS_DIR)
+            self._maestro_dir_ready = True
+        with open(self.current_maestro_flow_file, CONSTANTS['WRITE_MODE']) as f:
+            f.write('# Maestro Flow generated by Android MCP\n')
+    
+    def _ensure_flow_initialized(self):
+        """Set up the flows directory and flow file before the first flow operation."""
+        if self._flow_initialized:
+            return
+        self._flow_initialized = True
+        try:
+            self._write_flow_file()
+        except Exception as e:
+            logger.error(f"Error creating Maestro flow file: {str(e)}")
+    
     def clear_maestro_flow(self):
         """Clear the current Maestro flow."""
-        self.maestro_flow = ""
+        self._flow_parts = []
+        self._flow_initialized = True
         logger.info("Maestro flow cleared")
         try:
-            with open(self.current_maestro_flow_file, CONSTANTS['WRITE_MODE']) as f:
-                f.write('# Maestro Flow generated by Android MCP\n')
+            self._write_flow_file()
             print(f"✅ Cleared current Maestro flow file: {self.current_maestro_flow_file}")
         except Exception as e:
             logger.error(f"Error clearing Maestro flow: {str(e)}")
@@ -147,24 +349,32 @@ class AndroidController:
     
     def append_to_maestro_flow(self, yaml_snippet):
         """Append to the current Maestro flow."""
-        self.maestro_flow += yaml_snippet
+        self._ensure_flow_initialized()
+        self._flow_parts.append(yaml_snippet)
         logger.info(f"Added to Maestro flow: {yaml_snippet.strip()}")
     
     def maestro_run_flow(self, device_id=None):
         """Run the current Maestro flow."""
-        if not self.maestro_flow:
+        self._ensure_flow_initialized()
+        flow = "".join(self._flow_parts)
+        if not flow:
             logger.error("No Maestro flow to run")
             return False
             
-        # Save flow to temporary file
-        flow_file = "maestro_flows/temp_flow.yaml"
-        os.makedirs(os.path.dirname(flow_file), exist_ok=True)
-        
-        with open(flow_file, "w") as f:
-            f.write(self.maestro_flow)
+        # Save flow to this controller's temporary file, created on first run and
+        # rewritten in place afterwards
+        if self._flow_tmp is None:
+            self._flow_tmp = tempfile.NamedTemporaryFile(
+                mode="w", prefix="temp_flow_", suffix=".yaml", dir=MAESTRO_FLOWS_DIR, delete=False
+            )
+        self._flow_tmp.seek(0)
+        self._flow_tmp.truncate()
+        self._flow_tmp.write(flow)
+        self._flow_tmp.flush()
+        flow_file = self._flow_tmp.name
         
         # Run Maestro test
-        cmd = ["maestro", "test", flow_file]
+        cmd = [self._maestro, "test", flow_file]
         if device_id:
             cmd.extend(["--device", device_id])
         
@@ -189,24 +399,13 @@ class AndroidController:
         Check if Maestro is installed and accessible.
         
         If Maestro is not installed, the user is prompted to continue without
-        Maestro or exit.
+        Maestro or exit. The ``maestro --version`` probe runs once per process.
         """
-        try:
-            stdout, stderr, return_code = run_command(
-                [CONSTANTS['MAESTRO_COMMAND'], '--version']
-            )
-            
-            if return_code == 0:
-                logger.info(f"Maestro is installed and accessible: {stdout.strip()}")
-                return True
-            else:
-                logger.warning("Maestro command failed")
-                self._handle_maestro_not_installed()
-                return False
-        except FileNotFoundError:
-            logger.warning("Maestro is not installed or not in PATH")
-            self._handle_maestro_not_installed()
-            return False
+        if _maestro_available(self._maestro):
+            return True
+        
+        self._handle_maestro_not_installed()
+        return False
     
     def get_installed_packages(self, device_id):
         """
@@ -220,15 +419,9 @@ class AndroidController:
         """
         logger.info(f"Getting installed packages on device {device_id}")
         try:
-            result = subprocess.run(
-                ["adb", "-s", device_id, "shell", "pm", "list", "packages"],
-                capture_output=True, text=True, check=True
-            )
+            output = self._run_adb_shell_checked(device_id, "pm list packages").decode(errors="replace")
             
-            packages = []
-            for line in result.stdout.strip().split('\n'):
-                if line.startswith('package:'):
-                    packages.append(line[8:])  # Remove 'package:' prefix
+            packages = _PACKAGE_LINE_RE.findall(output)
             
             logger.info(f"Found {len(packages)} packages on device {device_id}")
             return packages
@@ -246,11 +439,22 @@ class AndroidController:
         """
         logger.info(f"Launching app {package_name} on device {device_id}")
         try:
-            # First, find the main activity
-            result = subprocess.run(
-                ["adb", "-s", device_id, "shell", "monkey", "-p", package_name, "-c", "android.intent.category.LAUNCHER", "1"],
-                capture_output=True, text=True, check=True
-            )
+            # `am start` resolves the launcher activity directly; monkey takes much
+            # longer to start up, so it is only the fallback
+            package = shlex.quote(package_name)
+            try:
+                output = self._run_adb_shell_checked(
+                    device_id,
+                    f"am start -a android.intent.action.MAIN "
+                    f"-c android.intent.category.LAUNCHER -p {package} 2>&1"
+                )
+                started = b"Error" not in output
+            except subprocess.CalledProcessError:
+                started = False
+            if not started:
+                self._run_adb_shell_checked(
+                    device_id, f"monkey -p {package} -c android.intent.category.LAUNCHER 1"
+                )
             logger.info(f"App {package_name} launched on device {device_id}")
             return True
         except Exception as e:
@@ -267,10 +471,7 @@ class AndroidController:
         """
         logger.info(f"Force stopping app {package_name} on device {device_id}")
         try:
-            result = subprocess.run(
-                ["adb", "-s", device_id, "shell", "am", "force-stop", package_name],
-                capture_output=True, text=True, check=True
-            )
+            self._run_adb_shell_checked(device_id, f"am force-stop {shlex.quote(package_name)}")
             logger.info(f"App {package_name} force stopped on device {device_id}")
             return True
         except Exception as e:
@@ -287,10 +488,7 @@ class AndroidController:
         """
         logger.info(f"Clearing data for app {package_name} on device {device_id}")
         try:
-            result = subprocess.run(
-                ["adb", "-s", device_id, "shell", "pm", "clear", package_name],
-                capture_output=True, text=True, check=True
-            )
+            self._run_adb_shell_checked(device_id, f"pm clear {shlex.quote(package_name)}")
             logger.info(f"Data cleared for app {package_name} on device {device_id}")
             return True
         except Exception as e:
@@ -307,12 +505,8 @@ class AndroidController:
         """
         logger.info(f"Inputting text on device {device_id}: {text}")
         try:
-            # Escape quotes
-            escaped_text = text.replace('"', '\\"')
-            result = subprocess.run(
-                ["adb", "-s", device_id, "shell", "input", "text", f'"{escaped_text}"'],
-                capture_output=True, text=True, check=True
-            )
+            # Same escaping as send_text, so the device shell expands nothing
+            self._run_adb_shell_checked(device_id, input_text_command(text))
             logger.info(f"Text input on device {device_id}")
             return True
         except Exception as e:
@@ -333,10 +527,7 @@ class AndroidController:
             if isinstance(key_code, str) and key_code.upper() in CONSTANTS['KEYCODES']:
                 key_code = CONSTANTS['KEYCODES'][key_code.upper()]
             
-            result = subprocess.run(
-                ["adb", "-s", device_id, "shell", "input", "keyevent", str(key_code)],
-                capture_output=True, text=True, check=True
-            )
+            self._run_adb_shell_checked(device_id, f"input keyevent {key_code}")
             logger.info(f"Key {key_code} pressed on device {device_id}")
             return True
         except Exception as e:
@@ -353,8 +544,8 @@ class AndroidController:
         logger.info(f"Rebooting device {device_id}")
         try:
             result = subprocess.run(
-                ["adb", "-s", device_id, "reboot"],
-                capture_output=True, text=True, check=True
+                self._adb_argv(device_id, "reboot"),
+                capture_output=True, text=True, check=True, timeout=ADB_TIMEOUT
             )
             logger.info(f"Device {device_id} rebooting")
             return True
@@ -374,16 +565,9 @@ class AndroidController:
         """
         logger.info(f"Getting device properties for {device_id}")
         try:
-            result = subprocess.run(
-                ["adb", "-s", device_id, "shell", "getprop"],
-                capture_output=True, text=True, check=True
-            )
+            output = self._run_adb_shell_checked(device_id, "getprop").decode(errors="replace")
             
-            properties = {}
-            for line in result.stdout.strip().split('\n'):
-                match = re.match(r'\[([^\]]+)\]:\s+\[([^\]]*)\]', line)
-                if match:
-                    properties[match.group(1)] = match.group(2)
+            properties = dict(_GETPROP_RE.findall(output))
             
             logger.info(f"Got {len(properties)} properties for device {device_id}")
             return properties
@@ -405,27 +589,269 @@ class AndroidController:
         if continue_without_maestro.lower() != 'y':
             sys.exit(1)
 
-    def _get_device_property(self, device_id: str, property_name: str) -> str:
+    def _adb_argv(self, device_id: str, *args: str) -> List[str]:
+        """
+        Build an ``adb -s <device_id> ...`` command line.
+        
+        The ``(adb, flag, device_id)`` prefix is built once per device and reused.
+        
+        Args:
+            device_id: The device ID/serial.
+            *args: The adb arguments following the device selector.
+            
+        Returns:
+            The full command as a list of strings.
+        """
+        prefix = self._device_prefix.get(device_id)
+        if prefix is None:
+            prefix = (self._adb, CONSTANTS['DEVICE_FLAG'], device_id)
+            self._device_prefix[device_id] = prefix
+        return [*prefix, *args]
+    
+    def _transfer_argv(self, device_id: str, command: str, source: str, destination: str) -> List[str]:
         """
-        Get a specific property from the device.
+        Build an ``adb push``/``adb pull`` command line.
+        
+        On platform-tools 34 and newer the transfer is compressed, which is
+        usually several times faster for compressible files. adb transfers
+        uncompressed when the device does not support it.
+        
+        Args:
+            device_id: The device ID/serial.
+            command: The push or pull command.
+            source: The path to copy from.
+            destination: The path to copy to.
+            
+        Returns:
+            The full command as a list of strings.
+        """
+        if _adb_supports_compression(self._adb):
+            return self._adb_argv(device_id, command, "-z", CONSTANTS['TRANSFER_COMPRESSION'],
+                                  source, destination)
+        return self._adb_argv(device_id, command, source, destination)
+    
+    def _get_shell(self, device_id: str) -> subprocess.Popen:
+        """
+        Get the persistent ``adb shell`` session for a device, starting it if needed.
         
         Args:
             device_id: The device ID/serial.
-            property_name: The name of the property to get.
             
         Returns:
-            The property value as a string.
+            The running shell process.
+        """
+        shell = self._shells.get(device_id)
+        if shell is None or shell.poll() is not None:
+            self._adb_ok
+            shell = subprocess.Popen(
+                self._adb_argv(device_id, "shell"),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            self._shells[device_id] = shell
+            logger.info(f"Started persistent adb shell for device {device_id}")
+        return shell
+    
+    def _shell_exec(self, device_id: str, command: str,
+                    timeout: float = ADB_TIMEOUT) -> Tuple[bytes, int]:
+        """
+        Run a command in the persistent shell session of a device.
+        
+        The command is followed by an ``echo`` of a sentinel carrying its exit
+        status, and stdout is read until that sentinel shows up. A session that
+        does not answer within the timeout is killed.
+        
+        The command runs in a ``{ ...; }`` group on its own line with stdin
+        from /dev/null, so a trailing comment cannot swallow the sentinel and
+        a command reading stdin cannot consume the next one.
+        
+        Args:
+            device_id: The device ID/serial.
+            command: The shell command to run.
+            timeout: Seconds to wait for the command to finish.
+            
+        Returns:
+            Tuple of (raw stdout, return_code)
+            
+        Raises:
+            ValueError: If the command has unbalanced quotes; nothing was sent.
+            OSError: If the session could not be started or written to; nothing ran.
+            subprocess.TimeoutExpired: If the command did not finish in time.
+            subprocess.SubprocessError: If the session died after the command was sent.
+        """
+        # An open quote would make the shell read the sentinel as part of the command
+        shlex.split(command)
+        
+        lock = self._shell_locks.setdefault(device_id, threading.Lock())
+        with lock:
+            shell = self._get_shell(device_id)
+            shell.stdin.write(f"{{ {command}\n}} </dev/null; echo {_SHELL_SENTINEL}$?__\n".encode())
+            shell.stdin.flush()
+            
+            # Killing the session unblocks readline, so a hung device cannot stall the caller
+            timed_out = threading.Event()
+            def expire():
+                timed_out.set()
+                shell.kill()
+            watchdog = threading.Timer(timeout, expire)
+            watchdog.daemon = True
+            watchdog.start()
+            try:
+                output = []
+                while True:
+                    line = shell.stdout.readline()
+                    if not line:
+                        # The session died; drop it so the next call starts a fresh one
+                        self._close_shell(device_id)
+                        if timed_out.is_set():
+                            raise subprocess.TimeoutExpired(command, timeout)
+                        # Not an OSError: the command may have run, so callers must not retry it
+                        raise subprocess.SubprocessError(
+                            f"adb shell session for {device_id} closed while running: {command}"
+                        )
+                    match = _SHELL_SENTINEL_RE.search(line)
+                    if match:
+                        output.append(line[:match.start()])
+                        return b"".join(output), int(match.group(1))
+                    output.append(line)
+            finally:
+                watchdog.cancel()
+    
+    def _close_shell(self, device_id: str) -> None:
         """
-        stdout, stderr, return_code = run_command([
-            CONSTANTS['ADB_COMMAND'], 
-            CONSTANTS['DEVICE_FLAG'], 
-            device_id, 
-            CONSTANTS['SHELL_COMMAND'], 
-            CONSTANTS['GETPROP_COMMAND'], 
-            property_name
-        ])
+        Terminate the persistent shell session of a device, if any.
+        
+        Args:
+            device_id: The device ID/serial.
+        """
+        shell = self._shells.pop(device_id, None)
+        if shell is None:
+            return
+        try:
+            shell.stdin.close()
+            shell.terminate()
+            shell.wait(timeout=1)
+        except (OSError, subprocess.SubprocessError):
+            shell.kill()
+        finally:
+            shell.stdout.close()
+    
+    def close(self) -> None:
+        """
+        Release controller resources.
+        
+        Waits for pending background transfers, closes all persistent adb
+        shell sessions and removes the temporary flow file.
+        """
+        if self._io_pool is not None:
+            self._io_pool.shutdown(wait=True)
+            self._io_pool = None
+        
+        for device_id in list(self._shells):
+            self._close_shell(device_id)
+        
+        if self._flow_tmp is not None:
+            self._flow_tmp.close()
+            try:
+                os.unlink(self._flow_tmp.name)
+            except OSError:
+                pass
+            self._flow_tmp = None
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+    
+    def _run_adb_shell_bytes(self, device_id: str, command: str,
+                             timeout: float = ADB_TIMEOUT) -> bytes:
+        """
+        Run an ADB shell command on the device and return its raw output.
+        
+        Commands are sent to a persistent shell session so that repeated calls
+        do not pay for a new adb process each time. If the command could not
+        be sent to the session, it falls back to a one-off ``adb shell``
+        invocation. Use this when only a regex-matched field is needed, to
+        skip decoding large outputs such as ``dumpsys``.
+        
+        Args:
+            device_id: The device ID/serial.
+            command: The shell command to run.
+            timeout: Seconds to wait for the command to finish.
+            
+        Returns:
+            The command output as bytes.
+            
+        Raises:
+            subprocess.TimeoutExpired: If the command does not finish in time.
+            subprocess.SubprocessError: If the session died while running the command.
+        """
+        try:
+            stdout, return_code = self._shell_exec(device_id, command, timeout)
+            return stdout
+        except (OSError, ValueError) as e:
+            logger.warning(f"Persistent adb shell unavailable for {device_id}: {str(e)}")
         
-        return stdout.strip()
+        cmd = self._adb_argv(device_id, CONSTANTS['SHELL_COMMAND'], command)
+        return subprocess.run(cmd, capture_output=True, timeout=timeout).stdout
+    
+    def _run_adb_shell_checked(self, device_id: str, command: str,
+                               timeout: float = ADB_TIMEOUT) -> bytes:
+        """
+        Run an ADB shell command on the device and fail if it exits non-zero.
+        
+        Like ``_run_adb_shell_bytes`` this goes through the persistent shell
+        session, falling back to a one-off ``adb shell`` invocation only when
+        the command could not be sent to the session.
+        
+        Args:
+            device_id: The device ID/serial.
+            command: The shell command to run.
+            timeout: Seconds to wait for the command to finish.
+            
+        Returns:
+            The command output as bytes.
+            
+        Raises:
+            subprocess.CalledProcessError: If the command exits non-zero.
+            subprocess.TimeoutExpired: If the command does not finish in time.
+            subprocess.SubprocessError: If the session died while running the command.
+        """
+        try:
+            stdout, return_code = self._shell_exec(device_id, command, timeout)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Persistent adb shell unavailable for {device_id}: {str(e)}")
+            return subprocess.run(
+                self._adb_argv(device_id, CONSTANTS['SHELL_COMMAND'], command),
+                capture_output=True, check=True, timeout=timeout
+            ).stdout
+        
+        if return_code != 0:
+            raise subprocess.CalledProcessError(return_code, command, output=stdout)
+        return stdout
+    
+    def exec_out(self, device_id: str, command: str) -> bytes:
+        """
+        Run a command with ``adb exec-out`` and return its raw stdout.
+        
+        Unlike ``adb shell``, exec-out does not use a pty, so binary output
+        (screenshots, XML dumps) arrives unmodified in a single round trip.
+        
+        Args:
+            device_id: The device ID/serial.
+            command: The command to run on the device.
+            
+        Returns:
+            The command output as bytes, or b"" on failure.
+        """
+        cmd = self._adb_argv(device_id, "exec-out", command)
+        try:
+            return subprocess.run(cmd, capture_output=True, timeout=ADB_TIMEOUT).stdout
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.error(f"Error running command {' '.join(cmd)}: {str(e)}")
+            return b""
     
     def _run_adb_shell_command(self, device_id: str, command: str) -> str:
         """
@@ -438,15 +864,7 @@ class AndroidController:
         Returns:
             The command output as a string.
         """
-        stdout, stderr, return_code = run_command([
-            CONSTANTS['ADB_COMMAND'], 
-            CONSTANTS['DEVICE_FLAG'], 
-            device_id, 
-            CONSTANTS['SHELL_COMMAND'], 
-            command
-        ])
-        
-        return stdout
+        return self._run_adb_shell_bytes(device_id, command).decode(errors="replace")
     
     def record_screen(self, device_id: str, duration: int = 30, output_path: Optional[str] = None) -> str:
         """
@@ -460,25 +878,45 @@ class AndroidController:
         Returns:
             The path to the saved recording file.
         """
+        return self.record_screen_async(device_id, duration, output_path).result()
+    
+    def record_screen_async(self, device_id: str, duration: int = 30,
+                            output_path: Optional[str] = None) -> Future:
+        """
+        Record device screen, then fetch the recording in the background.
+        
+        This blocks for the recording itself but returns as soon as it ends, so
+        callers doing sequential captures can start the next recording while
+        the previous file is still being transferred.
+        
+        Args:
+            device_id: The device ID.
+            duration: Recording duration in seconds.
+            output_path: Path to save the recording. If None, a timestamped filename is generated.
+            
+        Returns:
+            A Future resolving to the path of the saved recording ("" on failure).
+        """
         logger.info(f"Recording screen on device {device_id}")
         
         if not output_path:
             timestamp = time.strftime("%Y%m%d_%H%M%S")
             output_path = f"screenrecord_{device_id}_{timestamp}.mp4"
         
-        # Remote path on device
-        device_path = "/data/local/tmp/screenrecord.mp4"
+        # Remote path on device, unique so pipelined recordings do not clash
+        device_path = f"/data/local/tmp/screenrecord_{next(self._record_counter)}.mp4"
         
         # Start recording in a separate thread (it blocks until finished)
         def record_thread():
             try:
                 logger.info(f"Starting screen recording for {duration} seconds")
-                cmd = [
-                    "adb", "-s", device_id, "shell", "screenrecord", 
+                cmd = self._adb_argv(
+                    device_id, "shell", "screenrecord", 
                     "--time-limit", str(duration), 
                     device_path
-                ]
-                subprocess.run(cmd, check=True)
+                )
+                subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               check=True, timeout=duration + ADB_TIMEOUT)
             except subprocess.SubprocessError as e:
                 logger.error(f"Error during screen recording: {str(e)}")
                 
@@ -491,23 +929,40 @@ class AndroidController:
         logger.info(f"Waiting for {duration} seconds to complete recording")
         thread.join(duration + 5)  # Add buffer time
         
-        # Pull recording from device
-        try:
-            subprocess.run(
-                ["adb", "-s", device_id, "pull", device_path, output_path],
-                check=True
-            )
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=2)
+        return self._io_pool.submit(self._fetch_recording, device_id, device_path, output_path)
+    
+    def _fetch_recording(self, device_id: str, device_path: str, output_path: str) -> str:
+        """
+        Stream a recording back and remove it from the device in one round trip.
+        
+        Args:
+            device_id: The device ID.
+            device_path: The recording path on the device.
+            output_path: The local path to save the recording to.
             
-            # Remove recording from device
-            subprocess.run(
-                ["adb", "-s", device_id, "shell", "rm", device_path],
-                check=True
-            )
+        Returns:
+            The local path of the recording, or "" on failure.
+        """
+        try:
+            with open(output_path, "wb") as f:
+                subprocess.run(
+                    self._adb_argv(device_id, "exec-out", f"cat {device_path} && rm {device_path}"),
+                    stdout=f, stderr=subprocess.DEVNULL, check=True
+                )
+            # exec-out drops the remote exit status; a failed cat shows up as no data
+            if os.path.getsize(output_path) == 0:
+                raise subprocess.SubprocessError(f"No recording data at {device_path}")
             
             logger.info(f"Screen recording saved to {output_path}")
             return output_path
-        except subprocess.SubprocessError as e:
+        except (OSError, subprocess.SubprocessError) as e:
             logger.error(f"Error retrieving screen recording: {str(e)}")
+            try:
+                os.unlink(output_path)
+            except OSError:
+                pass
             return ""
 
     def list_packages(self, device_id: str) -> List[str]:
@@ -523,14 +978,7 @@ class AndroidController:
         logger.info(f"Listing packages on device {device_id}")
         command = f"pm list packages"
         result = self._run_adb_shell_command(device_id, command)
-        
-        packages = []
-        for line in result.splitlines():
-            if line.startswith("package:"):
-                package_name = line.split("package:")[1].strip()
-                packages.append(package_name)
-                
-        return packages
+        return _PACKAGE_LINE_RE.findall(result)
         
     def tap_screen(self, device_id: str, x: int, y: int) -> None:
         """
@@ -543,7 +991,7 @@ class AndroidController:
         """
         logger.info(f"Tapping on screen at ({x}, {y}) on device {device_id}")
         command = f"input tap {x} {y}"
-        self._run_adb_shell_command(device_id, command)
+        self._run_adb_shell_bytes(device_id, command)
         
     def swipe_screen(self, device_id: str, x1: int, y1: int, x2: int, y2: int, duration: int = 300) -> None:
         """
@@ -559,21 +1007,22 @@ class AndroidController:
         """
         logger.info(f"Swiping on screen from ({x1}, {y1}) to ({x2}, {y2}) on device {device_id}")
         command = f"input swipe {x1} {y1} {x2} {y2} {duration}"
-        self._run_adb_shell_command(device_id, command)
+        self._run_adb_shell_bytes(device_id, command)
     
-    def send_text(self, device_id: str, text: str) -> None:
+    def send_text(self, device_id: str, text: str, submit: bool = False) -> None:
         """
         Type text on the device.
         
         Args:
             device_id: The device ID.
             text: The text to type.
+            submit: Whether to press Enter afterwards, in the same shell call.
         """
         logger.info(f"Typing text on device {device_id}")
-        # Escape special characters for shell
-        text = text.replace(" ", "%s").replace("'", "\\'").replace('"', '\\"')
-        command = f"input text '{text}'"
-        self._run_adb_shell_command(device_id, command)
+        command = input_text_command(text)
+        if submit:
+            command += f"; input keyevent {CONSTANTS['KEYCODES']['ENTER']}"
+        self._run_adb_shell_bytes(device_id, command)
     
     def send_keyevent(self, device_id: str, keycode: int) -> None:
         """
@@ -585,7 +1034,7 @@ class AndroidController:
         """
         logger.info(f"Sending keyevent {keycode} to device {device_id}")
         command = f"input keyevent {keycode}"
-        self._run_adb_shell_command(device_id, command)
+        self._run_adb_shell_bytes(device_id, command)
     
     def pull_file(self, device_id: str, device_path: str, local_path: Optional[str] = None) -> str:
         """
@@ -604,14 +1053,7 @@ class AndroidController:
             
         logger.info(f"Pulling file from {device_path} to {local_path} on device {device_id}")
         
-        command = [
-            CONSTANTS['ADB_COMMAND'],
-            CONSTANTS['DEVICE_FLAG'],
-            device_id,
-            CONSTANTS['PULL_COMMAND'],
-            device_path,
-            local_path
-        ]
+        command = self._transfer_argv(device_id, CONSTANTS['PULL_COMMAND'], device_path, local_path)
         
         stdout, stderr, return_code = run_command(command)
         
@@ -628,7 +1070,7 @@ class AndroidController:
         
         Args:
             device_id: The device ID.
-            local_path: The local path of the file.
+            local_path: The local path of the file, or a directory to push recursively in one call.
             device_path: The path on the device to save the file to.
             
         Returns:
@@ -636,14 +1078,7 @@ class AndroidController:
         """
         logger.info(f"Pushing file from {local_path} to {device_path} on device {device_id}")
         
-        command = [
-            CONSTANTS['ADB_COMMAND'],
-            CONSTANTS['DEVICE_FLAG'],
-            device_id,
-            CONSTANTS['PUSH_COMMAND'],
-            local_path,
-            device_path
-        ]
+        command = self._transfer_argv(device_id, CONSTANTS['PUSH_COMMAND'], local_path, device_path)
         
         stdout, stderr, return_code = run_command(command)
         
@@ -6,13 +6,22 @@ This module implements a MCP (Model Context Protocol) server using the fastmcp l
 to allow remote control of Android devices through AI assistants and MCP clients.
 """
 
-import os
+import io
+import re
 import sys
+import time
 import json
+import shlex
 import base64
+import asyncio
 import logging
+import functools
 import argparse
-from typing import Dict, List, Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+from ..config import ADB_TIMEOUT, DEVICE_THREADS, USE_UIAUTOMATOR2
+from ..utils import input_text_command
 
 # Import FastMCP library
 FASTMCP_AVAILABLE = False
@@ -23,6 +32,39 @@ try:
 except ImportError:
     FASTMCP_AVAILABLE = False
 
+# Optional: lxml's C parser for UI hierarchy dumps, with the stdlib as fallback
+LXML_AVAILABLE = False
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    import xml.etree.ElementTree as etree
+    LXML_AVAILABLE = False
+
+# Optional: uiautomator2 keeps a UI agent resident on the device
+UIAUTOMATOR2_AVAILABLE = False
+try:
+    import uiautomator2
+    UIAUTOMATOR2_AVAILABLE = True
+except ImportError:
+    UIAUTOMATOR2_AVAILABLE = False
+
+# Optional: Pillow, used to re-encode screenshots as JPEG
+PIL_AVAILABLE = False
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Optional: SIMD-accelerated base64 for screenshot payloads
+PYBASE64_AVAILABLE = False
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -35,6 +77,43 @@ android_mcp = None
 current_device = None
 mcp_server = None
 
+# UI Automator node bounds, e.g. "[0,0][1080,2340]"
+_BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+# `wm size` output, e.g. "Physical size: 1080x2340"
+_WM_SIZE_RE = re.compile(r"Physical size:\s*(\d+)x(\d+)")
+
+# Valid Android package names: dot-separated letters, digits and underscores
+_PACKAGE_RE = re.compile(r"[A-Za-z0-9_.]+")
+
+# Map button names to keycodes
+_BUTTON_MAP = {
+    "BACK": 4,
+    "HOME": 3,
+    "VOLUME_UP": 24,
+    "VOLUME_DOWN": 25,
+    "ENTER": 66
+}
+
+# Swipe start/end points per direction as (numerator, denominator) fractions
+# of the screen: x1, y1, x2, y2
+_SWIPE_FRACTIONS = {
+    "up": ((1, 2), (2, 3), (1, 2), (1, 3)),
+    "down": ((1, 2), (1, 3), (1, 2), (2, 3)),
+    "left": ((2, 3), (1, 2), (1, 3), (1, 2)),
+    "right": ((1, 3), (1, 2), (2, 3), (1, 2)),
+}
+
+# uiautomator2 connections per device, reused across UI dumps
+_u2_devices: Dict[str, Any] = {}
+
+# Installed packages per device as (monotonic timestamp, packages)
+_PACKAGES_TTL = 30.0
+_packages_cache: Dict[str, Tuple[float, List[str]]] = {}
+
+# Physical screen size per device; it does not change within a session
+_screen_sizes: Dict[str, Tuple[int, int]] = {}
+
 def _initialize():
     """Initialize the MCP server components."""
     global android_mcp, mcp_server
@@ -63,36 +142,92 @@ def _initialize():
         logger.error("FastMCP not available")
         return False
 
+def _b64encode(data) -> str:
+    """Base64-encode bytes to a str, using pybase64 when it is installed."""
+    if PYBASE64_AVAILABLE:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode('ascii')
+
+def _forget_disconnected(devices: List[str]) -> None:
+    """Drop cached screen sizes of devices that are no longer connected."""
+    for device_id in list(_screen_sizes):
+        if device_id not in devices:
+            del _screen_sizes[device_id]
+
+def _screen_size(device_id: str) -> Optional[Tuple[int, int]]:
+    """Return the physical screen size, running `wm size` only once per device."""
+    size = _screen_sizes.get(device_id)
+    if size is None:
+        result = android_mcp._run_adb_shell_command(device_id, "wm size")
+        match = _WM_SIZE_RE.search(result)
+        if match:
+            size = _screen_sizes[device_id] = (int(match.group(1)), int(match.group(2)))
+    return size
+
+def _to_jpeg(png_data: bytes, quality: int) -> bytes:
+    """Re-encode PNG bytes as JPEG at the given quality."""
+    if not PIL_AVAILABLE:
+        raise Exception("JPEG screenshots require Pillow (pip install pillow)")
+    
+    with Image.open(io.BytesIO(png_data)) as image:
+        output = io.BytesIO()
+        # JPEG has no alpha channel
+        image.convert("RGB").save(output, format="JPEG", quality=max(1, min(quality, 95)))
+    return output.getvalue()
+
 # Define tool functions for MCP methods
 
+def _resolve_device(device: Optional[str] = None) -> str:
+    """Return the device a tool call targets.
+    
+    Tools accept an explicit device serial so several devices can be driven
+    in parallel; without one they act on the device picked by use_device.
+    """
+    device_id = device or current_device
+    if not device_id:
+        raise Exception("No device selected")
+    return device_id
+
+def _describe_device(device_id: str) -> Dict[str, str]:
+    """Format one device for the MCP protocol."""
+    try:
+        # Get device info
+        info = android_mcp.get_device_info(device_id)
+        
+        # Format for MCP protocol
+        return {
+            "id": device_id,
+            "name": f"{info.get('model', 'Unknown')}",
+            "type": "android"
+        }
+    except Exception as e:
+        logger.error(f"Error getting device info: {str(e)}")
+        # Add basic info if we can't get detailed info
+        return {
+            "id": device_id,
+            "name": "Android Device",
+            "type": "android"
+        }
+
 def list_available_devices():
     """List all available devices"""
     try:
-        devices = android_mcp.get_devices()
-        device_list = []
+        # One `adb devices -l` usually names every model already
+        models = android_mcp.get_device_models()
+        _forget_disconnected(list(models))
         
-        for device_id in devices:
-            try:
-                # Get device info
-                info = android_mcp.get_device_info(device_id)
-                
-                # Format for MCP protocol
-                device_info = {
-                    "id": device_id,
-                    "name": f"{info.get('model', 'Unknown')}",
-                    "type": "android"
-                }
-                device_list.append(device_info)
-            except Exception as e:
-                logger.error(f"Error getting device info: {str(e)}")
-                # Add basic info if we can't get detailed info
-                device_list.append({
-                    "id": device_id,
-                    "name": "Android Device",
-                    "type": "android"
-                })
-        
-        return device_list
+        # Only devices adb did not describe need a per-device lookup; those are
+        # bound on adb round trips, so overlap them instead of querying one by one
+        missing = [device_id for device_id, model in models.items() if not model]
+        described = {}
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(len(missing), DEVICE_THREADS)) as executor:
+                described = dict(zip(missing, executor.map(_describe_device, missing)))
+        
+        return [
+            described.get(device_id) or {"id": device_id, "name": model, "type": "android"}
+            for device_id, model in models.items()
+        ]
     except Exception as e:
         logger.error(f"Error listing devices: {str(e)}")
         raise Exception(f"Failed to list devices: {str(e)}")
@@ -106,8 +241,14 @@ def use_device(device: str, deviceType: str = "android"):
             raise Exception("Missing required parameter: device")
         
         devices = android_mcp.get_devices()
+        _forget_disconnected(devices)
         if device in devices:
             current_device = device
+            # Prefetch the screen size so the first gesture skips `wm size`
+            try:
+                _screen_size(device)
+            except Exception as e:
+                logger.warning(f"Could not read screen size of {device}: {str(e)}")
             return True
         else:
             raise Exception(f"Device {device} not found")
@@ -115,234 +256,201 @@ def use_device(device: str, deviceType: str = "android"):
         logger.error(f"Error selecting device: {str(e)}")
         raise Exception(f"Failed to use device: {str(e)}")
 
-def take_screenshot():
-    """Take a screenshot of the device"""
-    if not current_device:
-        raise Exception("No device selected")
+def take_screenshot(quality: Optional[int] = None, device: Optional[str] = None):
+    """Take a screenshot of the device
+    
+    Returns the base64-encoded PNG. If a JPEG quality (1-95) is given, the
+    image is re-encoded as JPEG first, which is typically several times
+    smaller to transfer.
+    """
+    device_id = _resolve_device(device)
     
     try:
-        screenshot_path = android_mcp.take_screenshot(current_device)
-        
-        # Check if file exists and read image data
-        if os.path.exists(screenshot_path):
-            with open(screenshot_path, "rb") as f:
-                image_data = f.read()
-            
-            # Base64 encode the image
-            image_b64 = base64.b64encode(image_data).decode('utf-8')
-            
-            # Delete the file after reading
-            try:
-                os.remove(screenshot_path)
-            except:
-                pass
-            
-            return image_b64
-        else:
+        # Pipe the PNG straight from adb into the encoder, no file on either side
+        image_data = android_mcp.exec_out(device_id, "screencap -p")
+        if not image_data:
             raise Exception("Failed to capture screenshot")
+        
+        if quality is not None:
+            image_data = _to_jpeg(image_data, int(quality))
+        
+        return _b64encode(image_data)
     except Exception as e:
         logger.error(f"Error taking screenshot: {str(e)}")
         raise Exception(f"Failed to take screenshot: {str(e)}")
 
-def list_apps():
-    """List all installed apps on the device"""
-    if not current_device:
-        raise Exception("No device selected")
+def list_apps(refresh: bool = False, device: Optional[str] = None):
+    """List all installed apps on the device
+    
+    The list is cached per device for a short time; pass refresh=True to
+    re-query it, e.g. right after installing or removing an app.
+    """
+    device_id = _resolve_device(device)
     
     try:
-        packages = android_mcp.list_packages(current_device)
-        return packages
+        now = time.monotonic()
+        cached = _packages_cache.get(device_id)
+        if not refresh and cached and now - cached[0] < _PACKAGES_TTL:
+            return list(cached[1])
+        
+        packages = android_mcp.list_packages(device_id)
+        # An empty list means the lookup failed; query again next time
+        if packages:
+            _packages_cache[device_id] = (now, packages)
+        return list(packages)
     except Exception as e:
         logger.error(f"Error listing apps: {str(e)}")
         raise Exception(f"Failed to list apps: {str(e)}")
 
-def launch_app(packageName: str):
+def launch_app(packageName: str, device: Optional[str] = None):
     """Launch an app on the device"""
-    if not current_device:
-        raise Exception("No device selected")
+    device_id = _resolve_device(device)
     
     try:
         if not packageName:
             raise Exception("Missing required parameter: packageName")
+        if not _PACKAGE_RE.fullmatch(packageName):
+            raise Exception(f"Invalid package name: {packageName}")
         
-        # Use monkey to launch app
-        result = android_mcp._run_adb_shell_command(
-            current_device, 
-            f"monkey -p {packageName} -c android.intent.category.LAUNCHER 1"
-        )
+        android_mcp.launch_app(device_id, packageName)
         return True
     except Exception as e:
         logger.error(f"Error launching app: {str(e)}")
         raise Exception(f"Failed to launch app: {str(e)}")
 
-def terminate_app(packageName: str):
+def terminate_app(packageName: str, device: Optional[str] = None):
     """Terminate an app on the device"""
-    if not current_device:
-        raise Exception("No device selected")
+    device_id = _resolve_device(device)
     
     try:
         if not packageName:
             raise Exception("Missing required parameter: packageName")
+        if not _PACKAGE_RE.fullmatch(packageName):
+            raise Exception(f"Invalid package name: {packageName}")
         
-        result = android_mcp._run_adb_shell_command(
-            current_device, 
-            f"am force-stop {packageName}"
+        android_mcp._run_adb_shell_bytes(
+            device_id, 
+            f"am force-stop {shlex.quote(packageName)}"
         )
         return True
     except Exception as e:
         logger.error(f"Error terminating app: {str(e)}")
         raise Exception(f"Failed to terminate app: {str(e)}")
 
-def get_screen_size():
+def get_screen_size(device: Optional[str] = None):
     """Get the screen size of the device"""
-    if not current_device:
-        raise Exception("No device selected")
+    device_id = _resolve_device(device)
     
     try:
-        # Get screen resolution from wm size
-        result = android_mcp._run_adb_shell_command(current_device, "wm size")
-        
-        # Parse result
-        for line in result.split("\n"):
-            if "Physical size" in line:
-                # Format: Physical size: 1080x2340
-                size = line.split(":")[1].strip()
-                width, height = map(int, size.split("x"))
-                return {"width": width, "height": height}
+        size = _screen_size(device_id)
+        if size:
+            width, height = size
+            return {"width": width, "height": height}
         
         raise Exception("Failed to get screen size")
     except Exception as e:
         logger.error(f"Error getting screen size: {str(e)}")
         raise Exception(f"Failed to get screen size: {str(e)}")
 
-def click_on_screen_at_coordinates(x: int, y: int):
+def click_on_screen_at_coordinates(x: int, y: int, device: Optional[str] = None):
     """Click/tap on the screen at the given coordinates"""
-    if not current_device:
-        raise Exception("No device selected")
+    device_id = _resolve_device(device)
     
     try:
         if x is None or y is None:
             raise Exception("Missing required parameters: x and y")
         
-        android_mcp.tap_screen(current_device, int(x), int(y))
+        android_mcp.tap_screen(device_id, int(x), int(y))
         return True
     except Exception as e:
         logger.error(f"Error tapping screen: {str(e)}")
         raise Exception(f"Failed to tap screen: {str(e)}")
 
-def swipe_on_screen(direction: str):
-    """Swipe on the screen in the given direction"""
-    if not current_device:
-        raise Exception("No device selected")
+def swipe_on_screen(direction: str = "", x1: Optional[int] = None, y1: Optional[int] = None,
+                    x2: Optional[int] = None, y2: Optional[int] = None, duration: int = 300,
+                    device: Optional[str] = None):
+    """Swipe on the screen in the given direction, or between explicit coordinates"""
+    device_id = _resolve_device(device)
     
     try:
-        if not direction:
-            raise Exception("Missing required parameter: direction")
-        
-        # Get screen size for calculating swipe coordinates
-        result = android_mcp._run_adb_shell_command(current_device, "wm size")
-        
-        width = 1080  # Default values
-        height = 1920
-        
-        # Parse result to get actual screen size
-        for line in result.split("\n"):
-            if "Physical size" in line:
-                size = line.split(":")[1].strip()
-                width, height = map(int, size.split("x"))
-        
-        # Calculate swipe coordinates based on direction
-        if direction.lower() == "up":
-            x1 = width // 2
-            y1 = height * 2 // 3
-            x2 = width // 2
-            y2 = height // 3
-        elif direction.lower() == "down":
-            x1 = width // 2
-            y1 = height // 3
-            x2 = width // 2
-            y2 = height * 2 // 3
-        elif direction.lower() == "left":
-            x1 = width * 2 // 3
-            y1 = height // 2
-            x2 = width // 3
-            y2 = height // 2
-        elif direction.lower() == "right":
-            x1 = width // 3
-            y1 = height // 2
-            x2 = width * 2 // 3
-            y2 = height // 2
+        coords = (x1, y1, x2, y2)
+        if any(c is not None for c in coords):
+            # Raw coordinates skip both the screen size and the direction lookup
+            if any(c is None for c in coords):
+                raise Exception("Coordinates x1, y1, x2 and y2 must all be given")
+            # They end up in a shell command, so only integers are accepted
+            x1, y1, x2, y2 = map(int, coords)
         else:
-            raise Exception("Invalid direction: must be 'up', 'down', 'left', or 'right'")
+            if not direction:
+                raise Exception("Missing required parameter: direction")
+            
+            # Get screen size for calculating swipe coordinates (default 1080x1920)
+            width, height = _screen_size(device_id) or (1080, 1920)
+            
+            # Calculate swipe coordinates based on direction
+            fractions = _SWIPE_FRACTIONS.get(direction.lower())
+            if fractions is None:
+                raise Exception("Invalid direction: must be 'up', 'down', 'left', or 'right'")
+            (x1n, x1d), (y1n, y1d), (x2n, x2d), (y2n, y2d) = fractions
+            x1 = width * x1n // x1d
+            y1 = height * y1n // y1d
+            x2 = width * x2n // x2d
+            y2 = height * y2n // y2d
         
         # Perform the swipe
-        android_mcp.swipe_screen(current_device, x1, y1, x2, y2, 300)
+        android_mcp.swipe_screen(device_id, x1, y1, x2, y2, int(duration))
         return True
     except Exception as e:
         logger.error(f"Error swiping screen: {str(e)}")
         raise Exception(f"Failed to swipe screen: {str(e)}")
 
-def type_keys(text: str, submit: bool = False):
+def type_keys(text: str, submit: bool = False, device: Optional[str] = None):
     """Type text into the device"""
-    if not current_device:
-        raise Exception("No device selected")
+    device_id = _resolve_device(device)
     
     try:
         if not text:
             raise Exception("Missing required parameter: text")
         
-        # Type the text
-        android_mcp.send_text(current_device, text)
-        
-        # Send enter key if submit is true
-        if submit:
-            android_mcp.send_keyevent(current_device, 66)  # KEYCODE_ENTER
+        # The controller sends the enter key in the same shell call if submit is true
+        android_mcp.send_text(device_id, text, submit=submit)
         
         return True
     except Exception as e:
         logger.error(f"Error typing text: {str(e)}")
         raise Exception(f"Failed to type text: {str(e)}")
 
-def press_button(button: str):
+def press_button(button: str, device: Optional[str] = None):
     """Press a button on the device"""
-    if not current_device:
-        raise Exception("No device selected")
+    device_id = _resolve_device(device)
     
     try:
         if not button:
             raise Exception("Missing required parameter: button")
         
-        # Map button names to keycodes
-        button_map = {
-            "BACK": 4,
-            "HOME": 3,
-            "VOLUME_UP": 24,
-            "VOLUME_DOWN": 25,
-            "ENTER": 66
-        }
-        
-        if button not in button_map:
+        # Button names are matched case-insensitively
+        keycode = _BUTTON_MAP.get(button.upper())
+        if keycode is None:
             raise Exception(f"Invalid button: {button}")
         
-        android_mcp.send_keyevent(current_device, button_map[button])
+        android_mcp.send_keyevent(device_id, keycode)
         return True
     except Exception as e:
         logger.error(f"Error pressing button: {str(e)}")
         raise Exception(f"Failed to press button: {str(e)}")
 
-def open_url(url: str):
+def open_url(url: str, device: Optional[str] = None):
     """Open a URL in the browser"""
-    if not current_device:
-        raise Exception("No device selected")
+    device_id = _resolve_device(device)
     
     try:
         if not url:
             raise Exception("Missing required parameter: url")
         
         # Use am to open URL
-        result = android_mcp._run_adb_shell_command(
-            current_device, 
-            f"am start -a android.intent.action.VIEW -d {url}"
+        android_mcp._run_adb_shell_bytes(
+            device_id, 
+            f"am start -a android.intent.action.VIEW -d {shlex.quote(url)}"
         )
         
         return True
@@ -350,82 +458,99 @@ def open_url(url: str):
         logger.error(f"Error opening URL: {str(e)}")
         raise Exception(f"Failed to open URL: {str(e)}")
 
-def list_elements_on_screen():
-    """List UI elements on the screen (using UI Automator)"""
-    if not current_device:
-        raise Exception("No device selected")
+def _parse_ui_elements(source) -> List[Dict[str, Any]]:
+    """Extract labelled, bounded elements from a UI Automator dump.
     
-    try:
-        # Use UI Automator to dump the UI hierarchy
-        dump_file = "/data/local/tmp/window_dump.xml"
-        android_mcp._run_adb_shell_command(current_device, f"uiautomator dump {dump_file}")
+    The dump is parsed incrementally: each node is read on its start event
+    (keeping document order), and on its end event it is cleared and detached
+    from its parent, so only the currently open branch stays in memory.
+    
+    Args:
+        source: Path or binary file object containing the XML dump
+        
+    Returns:
+        List of dicts with the element id, text and center point
+    """
+    elements = []
+    # Elements from the root down to the one being parsed
+    open_elems = []
+    for event, elem in etree.iterparse(source, events=("start", "end")):
+        if event == "end":
+            open_elems.pop()
+            elem.clear()
+            if open_elems:
+                open_elems[-1].remove(elem)
+            continue
         
-        # Pull the file
-        local_dump = "window_dump.xml"
-        android_mcp.pull_file(current_device, dump_file, local_dump)
+        open_elems.append(elem)
+        if elem.tag != "node":
+            continue
         
-        # Check if file exists
-        if not os.path.exists(local_dump):
-            raise Exception("Failed to get UI hierarchy")
+        attrs = elem.attrib
+        
+        # Parse bounds (format is like "[0,0][1080,2340]") into the center point
+        bounds = []
+        match = _BOUNDS_RE.fullmatch(attrs.get("bounds", ""))
+        if match:
+            x1, y1, x2, y2 = map(int, match.groups())
+            bounds = [(x1 + x2) // 2, (y1 + y2) // 2]
+        
+        # Get text or description
+        text = attrs.get("text", "")
+        content_desc = attrs.get("content-desc", "")
+        resource_id = attrs.get("resource-id", "")
+        
+        # Use content description if text is empty
+        display_text = text if text else content_desc
+        
+        # Skip elements without text or bounds
+        if (display_text or resource_id) and bounds:
+            elements.append({
+                "id": resource_id,
+                "text": display_text,
+                "bounds": bounds
+            })
+    
+    return elements
+
+def _dump_ui_hierarchy(device_id: str) -> bytes:
+    """Dump the UI hierarchy XML with `uiautomator dump`.
+    
+    A plain `uiautomator dump` cold-starts instrumentation on the device for
+    every call. With ANDROID_MCP_UIAUTOMATOR2=1 a resident uiautomator2 agent
+    is used instead; it is installed on the device on first use and can keep
+    `uiautomator dump` from running while it is active.
+    """
+    if USE_UIAUTOMATOR2 and UIAUTOMATOR2_AVAILABLE:
+        try:
+            device = _u2_devices.get(device_id)
+            if device is None:
+                device = _u2_devices[device_id] = uiautomator2.connect(device_id)
+            return device.dump_hierarchy().encode("utf-8")
+        except Exception as e:
+            logger.warning(f"uiautomator2 agent unavailable, using uiautomator dump: {str(e)}")
+            _u2_devices.pop(device_id, None)
+    
+    # Stream the UI hierarchy over adb stdout, no dump file on either side
+    dump = android_mcp.exec_out(device_id, "uiautomator dump /dev/stdout")
+    
+    # uiautomator appends a "UI hierchary dumped to: ..." trailer
+    end = dump.rfind(b"</hierarchy>")
+    if end < 0:
+        raise Exception("Failed to get UI hierarchy")
+    return dump[:end + len(b"</hierarchy>")]
+
+def list_elements_on_screen(device: Optional[str] = None):
+    """List UI elements on the screen (using UI Automator)"""
+    device_id = _resolve_device(device)
+    
+    try:
+        dump = _dump_ui_hierarchy(device_id)
         
         # Parse the XML and extract elements
         try:
-            import xml.etree.ElementTree as ET
-            tree = ET.parse(local_dump)
-            root = tree.getroot()
-            
-            elements = []
-            for elem in root.findall(".//node"):
-                attrs = elem.attrib
-                
-                # Get bounds
-                bounds_str = attrs.get("bounds", "")
-                bounds = []
-                
-                # Parse bounds (format is like "[0,0][1080,2340]")
-                if bounds_str:
-                    parts = bounds_str.strip("[]").split("][")
-                    if len(parts) == 2:
-                        try:
-                            x1, y1 = map(int, parts[0].split(","))
-                            x2, y2 = map(int, parts[1].split(","))
-                            
-                            # Calculate center point
-                            center_x = (x1 + x2) // 2
-                            center_y = (y1 + y2) // 2
-                            
-                            bounds = [center_x, center_y]
-                        except:
-                            bounds = []
-                
-                # Get text or description
-                text = attrs.get("text", "")
-                content_desc = attrs.get("content-desc", "")
-                resource_id = attrs.get("resource-id", "")
-                
-                # Use content description if text is empty
-                display_text = text if text else content_desc
-                
-                # Skip elements without text or bounds
-                if (display_text or resource_id) and bounds:
-                    elements.append({
-                        "id": resource_id,
-                        "text": display_text,
-                        "bounds": bounds
-                    })
-            
-            # Clean up
-            try:
-                os.remove(local_dump)
-                android_mcp._run_adb_shell_command(current_device, f"rm {dump_file}")
-            except:
-                pass
-            
-            return elements
+            return _parse_ui_elements(io.BytesIO(dump))
         
-        except ImportError:
-            logger.error("ElementTree XML parser not available")
-            raise Exception("XML parser not available")
         except Exception as e:
             logger.error(f"Error parsing UI hierarchy: {str(e)}")
             raise Exception(f"Failed to parse UI hierarchy: {str(e)}")
@@ -434,6 +559,84 @@ def list_elements_on_screen():
         logger.error(f"Error listing elements: {str(e)}")
         raise Exception(f"Failed to list elements: {str(e)}")
 
+def _batch_command(op: Dict[str, Any]) -> str:
+    """Translate one batch operation into an on-device shell command."""
+    action = op.get("action")
+    if action == "tap":
+        return f"input tap {int(op['x'])} {int(op['y'])}"
+    if action == "swipe":
+        return (f"input swipe {int(op['x1'])} {int(op['y1'])} "
+                f"{int(op['x2'])} {int(op['y2'])} {int(op.get('duration', 300))}")
+    if action == "key":
+        return f"input keyevent {int(op['keycode'])}"
+    if action == "button":
+        keycode = _BUTTON_MAP.get(str(op["button"]).upper())
+        if keycode is None:
+            raise Exception(f"Invalid button: {op['button']}")
+        return f"input keyevent {keycode}"
+    if action == "text":
+        return input_text_command(str(op["text"]))
+    if action == "sleep":
+        return f"sleep {float(op['seconds'])}"
+    raise Exception(f"Invalid action: {action}")
+
+def batch_actions(ops: List[Dict[str, Any]], device: Optional[str] = None):
+    """Run a sequence of tap/swipe/key/button/text/sleep actions in one adb round trip
+    
+    The batch stops at the first action that fails, and the failure is raised.
+    Each op is a dict with an "action" key and its parameters:
+    {"action": "tap", "x": 100, "y": 200},
+    {"action": "swipe", "x1": 0, "y1": 0, "x2": 100, "y2": 100, "duration": 300},
+    {"action": "key", "keycode": 4}, {"action": "button", "button": "BACK"},
+    {"action": "text", "text": "hello"}, {"action": "sleep", "seconds": 0.5}
+    """
+    device_id = _resolve_device(device)
+    
+    try:
+        if not ops:
+            raise Exception("Missing required parameter: ops")
+        
+        # Validate every op before sending anything to the device; stop at the first failure
+        script = " && ".join(_batch_command(op) for op in ops)
+        
+        # The sleeps are part of the script, so they extend its time limit
+        sleeps = sum(float(op["seconds"]) for op in ops if op.get("action") == "sleep")
+        android_mcp._run_adb_shell_checked(device_id, script, timeout=ADB_TIMEOUT + sleeps)
+        return True
+    except Exception as e:
+        logger.error(f"Error running batch: {str(e)}")
+        raise Exception(f"Failed to run batch: {str(e)}")
+
+# MCP tools, registered under their function names
+TOOLS = (
+    list_available_devices,
+    use_device,
+    take_screenshot,
+    list_apps,
+    launch_app,
+    terminate_app,
+    get_screen_size,
+    click_on_screen_at_coordinates,
+    swipe_on_screen,
+    type_keys,
+    press_button,
+    open_url,
+    list_elements_on_screen,
+    batch_actions,
+)
+
+def _run_in_thread(fn):
+    """Wrap a blocking tool so the event loop awaits it from a worker thread.
+    
+    The tools block on adb round trips; running them off the loop lets FastMCP
+    keep serving other requests and overlap commands for different devices.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+    return wrapper
+
 def register_tools():
     """Register all MCP tools with the server."""
     global mcp_server
@@ -444,19 +647,8 @@ def register_tools():
     
     try:
         # Add all the tools to the FastMCP server
-        mcp_server.add_tool(name="list_available_devices", fn=list_available_devices)
-        mcp_server.add_tool(name="use_device", fn=use_device)
-        mcp_server.add_tool(name="take_screenshot", fn=take_screenshot)
-        mcp_server.add_tool(name="list_apps", fn=list_apps)
-        mcp_server.add_tool(name="launch_app", fn=launch_app)
-        mcp_server.add_tool(name="terminate_app", fn=terminate_app)
-        mcp_server.add_tool(name="get_screen_size", fn=get_screen_size)
-        mcp_server.add_tool(name="click_on_screen_at_coordinates", fn=click_on_screen_at_coordinates)
-        mcp_server.add_tool(name="swipe_on_screen", fn=swipe_on_screen)
-        mcp_server.add_tool(name="type_keys", fn=type_keys)
-        mcp_server.add_tool(name="press_button", fn=press_button)
-        mcp_server.add_tool(name="open_url", fn=open_url)
-        mcp_server.add_tool(name="list_elements_on_screen", fn=list_elements_on_screen)
+        for tool in TOOLS:
+            mcp_server.add_tool(name=tool.__name__, fn=_run_in_thread(tool))
         
         logger.info("All tools registered successfully")
         return True
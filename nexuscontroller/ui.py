@@ -166,18 +166,17 @@ class MainMenu(Menu):
         
         # Display available devices
         print(f"\nFound {len(devices)} connected device(s):")
-        for i, device_id in enumerate(devices):
-            try:
-                info = self.controller.get_device_info(device_id)
-                print(f"{i + 1}. {info.get('manufacturer', 'Unknown')} {info.get('model', 'Unknown')} " + 
-                      f"(Android {info.get('android_version', 'Unknown')}, API {info.get('api_level', 'Unknown')})")
-                print(f"   Battery: {info.get('battery_level', 'Unknown')}% " + 
-                      f"({info.get('battery_status', 'Unknown')}), Resolution: {info.get('screen_resolution', 'Unknown')}")
-                print(f"   IP: {info.get('ip_address', 'Unknown')}")
-                print(f"   ID: {device_id}")
-            except Exception as e:
-                logger.error(f"Error getting device info: {str(e)}")
+        infos = self.controller.get_devices_info(devices)
+        for i, (device_id, info) in enumerate(infos.items()):
+            if info is None:
                 print(f"{i + 1}. Device ID: {device_id} (Error getting device info)")
+                continue
+            print(f"{i + 1}. {info.get('manufacturer', 'Unknown')} {info.get('model', 'Unknown')} " + 
+                  f"(Android {info.get('android_version', 'Unknown')}, API {info.get('api_level', 'Unknown')})")
+            print(f"   Battery: {info.get('battery_level', 'Unknown')}% " + 
+                  f"({info.get('battery_status', 'Unknown')}), Resolution: {info.get('screen_resolution', 'Unknown')}")
+            print(f"   IP: {info.get('ip_address', 'Unknown')}")
+            print(f"   ID: {device_id}")
         
         # Auto-select if only one device
         if len(devices) == 1:
@@ -4,6 +4,7 @@ Utility functions for Android MCP.
 
 import os
 import re
+import shlex
 import logging
 import subprocess
 import sys
@@ -89,6 +90,21 @@ def extract_regex_match(pattern: str, text: str, group: int = 1, default: str =
         return match.group(group)
     return default
 
+def input_text_command(text: str) -> str:
+    """
+    Build an `input text` command for the device shell.
+    
+    `input text` reads %s as a space; the text is then shell-quoted so
+    quotes, $, backticks and backslashes are typed literally.
+    
+    Args:
+        text: Text to type
+        
+    Returns:
+        The shell command
+    """
+    return f"input text {shlex.quote(text.replace(' ', '%s'))}"
+
 def ensure_directory_exists(path: str) -> None:
     """
     Ensure a directory exists, creating it if necessary.
@@ -55,10 +55,23 @@ class SubMenu(Menu):
         super().__init__(title, description)
         self.items = items or []
         self.back_option = back_option
+        self._rendered = None
+        self._dispatch = {i + 1: item for i, item in enumerate(self.items)}
     
     def add_item(self, item):
         """Add an item to the submenu."""
         self.items.append(item)
+        self._dispatch[len(self.items)] = item
+        self._rendered = None
+    
+    def render(self):
+        """Return the option list, built once and reused until items change."""
+        if self._rendered is None:
+            lines = [f"{i+1}. {item.display()}" for i, item in enumerate(self.items)]
+            if self.back_option:
+                lines.append("0. Back")
+            self._rendered = "\n".join(lines)
+        return self._rendered
     
     def execute(self):
         """Display and handle the submenu."""
@@ -68,18 +81,15 @@ class SubMenu(Menu):
                 print(self.description)
             print()
             
-            for i, item in enumerate(self.items):
-                print(f"{i+1}. {item.display()}")
-            
-            if self.back_option:
-                print("0. Back")
+            print(self.render())
             
             try:
                 choice = int(input("\nSelect option: "))
-                if choice == 0 and self.back_option:
+                item = self._dispatch.get(choice)
+                if item is not None:
+                    item.execute()
+                elif choice == 0 and self.back_option:
                     break
-                elif 1 <= choice <= len(self.items):
-                    self.items[choice-1].execute()
                 else:
                     print("Invalid option. Please try again.")
             except ValueError:
@@ -105,9 +115,12 @@ def select_device():
     
     print(f"\nFound {len(devices)} connected device(s):")
     
-    for i, device_id in enumerate(devices):
-        info = controller.get_device_info(device_id)
-        print(f"{i+1}. {info['model']} (Android {info['android_version']}) - ID: {device_id}")
+    infos = controller.get_devices_info(devices)
+    for i, (device_id, info) in enumerate(infos.items()):
+        if info is None:
+            print(f"{i+1}. Device ID: {device_id} (Error getting device info)")
+        else:
+            print(f"{i+1}. {info['model']} (Android {info['android_version']}) - ID: {device_id}")
     
     # Device selection
     if len(devices) == 1:
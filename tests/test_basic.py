@@ -5,14 +5,23 @@ Basic tests for the NexusController package.
 
 import os
 import sys
+import io
+import shutil
+import subprocess
+import tempfile
 import unittest
+from datetime import date
 from unittest.mock import patch, MagicMock
 
 # Add the parent directory to the path so we can import the package
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from nexuscontroller import AndroidController
+from nexuscontroller import AndroidController, config
+from nexuscontroller import controller as controller_module
 from nexuscontroller.utils import generate_timestamp_filename, extract_regex_match
+from nexuscontroller.mcp import server
+import generate_report
+import nexuscontroller_cli
 
 class TestBasicFunctionality(unittest.TestCase):
     """Test basic functionality of the NexusController package."""
@@ -33,6 +42,42 @@ class TestBasicFunctionality(unittest.TestCase):
             controller = AndroidController()
             self.assertIsNotNone(controller)
             
+    def test_get_devices_parsing(self):
+        """Test that only authorized devices are returned from `adb devices`."""
+        with patch('nexuscontroller.controller.subprocess.run') as mock_run:
+            mock_process = MagicMock()
+            mock_process.stdout = (
+                "List of devices attached\n"
+                "emulator-5554\tdevice\n"
+                "R58M123ABC\tunauthorized\n"
+                "192.168.1.20:5555\toffline\n"
+                "HA1V2CL8\tdevice\n\n"
+            )
+            mock_process.returncode = 0
+            mock_run.return_value = mock_process
+            
+            controller = AndroidController()
+            self.assertEqual(controller.get_devices(), ["emulator-5554", "HA1V2CL8"])
+
+    def test_get_device_models_parsing(self):
+        """Test that models are read from `adb devices -l` output."""
+        with patch('nexuscontroller.controller.subprocess.run') as mock_run:
+            mock_process = MagicMock()
+            mock_process.stdout = (
+                "List of devices attached\n"
+                "emulator-5554          device product:sdk_gphone64 model:sdk_gphone64_x86_64 device:emu64xa transport_id:1\n"
+                "R58M123ABC             unauthorized usb:1-1 transport_id:2\n"
+                "HA1V2CL8               device usb:1-2 transport_id:3\n\n"
+            )
+            mock_process.returncode = 0
+            mock_run.return_value = mock_process
+
+            controller = AndroidController()
+            self.assertEqual(
+                controller.get_device_models(),
+                {"emulator-5554": "sdk_gphone64_x86_64", "HA1V2CL8": None}
+            )
+
     def test_utils(self):
         """Test utility functions."""
         # Test timestamp filename generation
@@ -44,6 +89,515 @@ class TestBasicFunctionality(unittest.TestCase):
         text = "Version: 1.2.3"
         version = extract_regex_match(r"Version: ([\d\.]+)", text)
         self.assertEqual(version, "1.2.3")
+    
+    def test_send_text_quoting(self):
+        """Test that typed text reaches `input text` literally, with an optional Enter."""
+        controller = AndroidController()
+        with patch.object(controller, "_run_adb_shell_bytes") as mock_shell:
+            controller.send_text("dev", "it's $HOME `id`", submit=True)
+        command = mock_shell.call_args[0][1]
+        self.assertTrue(command.endswith("; input keyevent 66"))
+        if shutil.which("sh"):
+            argv = subprocess.run(
+                ["sh", "-c", "input() { printf '%s|' \"$@\"; }; " + command.replace("; input keyevent 66", "")],
+                capture_output=True, text=True
+            ).stdout
+            self.assertEqual(argv, "text|it's%s$HOME%s`id`|")
+        
+        with patch.object(controller, "_run_adb_shell_checked") as mock_checked:
+            controller.input_text("dev", "it's $HOME `id`")
+        self.assertEqual(mock_checked.call_args[0][1], command.replace("; input keyevent 66", ""))
+    
+    def test_env_number(self):
+        """Test that a malformed numeric setting falls back to its default."""
+        with patch.dict(os.environ, {"ANDROID_MCP_DEVICE_THREADS": "4"}):
+            self.assertEqual(config._env_number("ANDROID_MCP_DEVICE_THREADS", 8, int), 4)
+        with patch.dict(os.environ, {"ANDROID_MCP_DEVICE_THREADS": "lots"}):
+            with self.assertLogs("nexuscontroller.config", "WARNING"):
+                self.assertEqual(config._env_number("ANDROID_MCP_DEVICE_THREADS", 8, int), 8)
+    
+    def test_launch_app_fallback(self):
+        """Test that monkey is only used when `am start` fails."""
+        controller = AndroidController()
+        monkey = "monkey -p com.example -c android.intent.category.LAUNCHER 1"
+        with patch.object(controller, "_run_adb_shell_checked") as mock_checked:
+            mock_checked.return_value = b"Starting: Intent { cmp=com.example/.Main }\n"
+            controller.launch_app("dev", "com.example")
+            self.assertEqual(mock_checked.call_count, 1)
+            self.assertIn("am start", mock_checked.call_args[0][1])
+            
+            for result in (b"Error: Activity not started, unable to resolve Intent\n",
+                           subprocess.CalledProcessError(1, "am")):
+                mock_checked.reset_mock()
+                mock_checked.side_effect = [result, b""]
+                controller.launch_app("dev", "com.example")
+                self.assertEqual(mock_checked.call_args_list[-1][0], ("dev", monkey))
+    
+    def test_transfer_compression(self):
+        """Test that push/pull are compressed only on platform-tools 34 and newer."""
+        controller = AndroidController()
+        clear_cache = controller_module._adb_supports_compression.cache_clear
+        self.addCleanup(clear_cache)
+        adb = controller._adb
+        
+        cases = (
+            ("Android Debug Bridge version 1.0.41\nVersion 35.0.1-11580240\n",
+             [adb, "-s", "dev", "pull", "-z", "brotli", "/sdcard/a.mp4", "a.mp4"]),
+            ("Android Debug Bridge version 1.0.41\nVersion 33.0.3-8952118\n",
+             [adb, "-s", "dev", "pull", "/sdcard/a.mp4", "a.mp4"]),
+            (None, [adb, "-s", "dev", "pull", "/sdcard/a.mp4", "a.mp4"]),
+        )
+        for output, argv in cases:
+            clear_cache()
+            with patch('nexuscontroller.controller._adb_version_output', return_value=output):
+                self.assertEqual(controller._transfer_argv("dev", "pull", "/sdcard/a.mp4", "a.mp4"), argv)
+
+class TestSubMenu(unittest.TestCase):
+    """Test rendering and dispatch of CLI submenus."""
+    
+    def test_render(self):
+        """Test that the option list is cached and rebuilt when items are added."""
+        menu = nexuscontroller_cli.SubMenu("Media", [
+            nexuscontroller_cli.ActionMenu("Screenshot", MagicMock()),
+            nexuscontroller_cli.ActionMenu("Record", MagicMock()),
+        ])
+        self.assertEqual(menu.render(), "1. Screenshot\n2. Record\n0. Back")
+        self.assertIs(menu.render(), menu.render())
+        menu.add_item(nexuscontroller_cli.ActionMenu("Pull", MagicMock()))
+        self.assertEqual(menu.render(), "1. Screenshot\n2. Record\n3. Pull\n0. Back")
+    
+    def test_dispatch(self):
+        """Test that choices reach the right item, including items added later."""
+        actions = [MagicMock(), MagicMock(), MagicMock()]
+        menu = nexuscontroller_cli.SubMenu("Media", [
+            nexuscontroller_cli.ActionMenu("Screenshot", actions[0]),
+            nexuscontroller_cli.ActionMenu("Record", actions[1]),
+        ])
+        menu.add_item(nexuscontroller_cli.ActionMenu("Pull", actions[2]))
+        
+        # Each choice is followed by the "Press Enter" prompt; 9 and x are rejected
+        answers = ["2", "", "3", "", "9", "", "x", "", "0"]
+        with patch('builtins.input', side_effect=answers), patch('builtins.print'):
+            menu.execute()
+        actions[0].assert_not_called()
+        actions[1].assert_called_once_with()
+        actions[2].assert_called_once_with()
+
+def _local_shell_argv(device_id, *args):
+    """Stand in for `adb -s <id> shell [cmd]` with a local sh."""
+    return ["sh"] if len(args) == 1 else ["sh", "-c", args[-1]]
+
+@unittest.skipUnless(shutil.which("sh"), "needs a POSIX shell")
+class TestPersistentShell(unittest.TestCase):
+    """Test the persistent shell session against a local sh."""
+    
+    def setUp(self):
+        self.controller = AndroidController()
+        self.controller._adb_checked = True
+        patcher = patch.object(self.controller, "_adb_argv", side_effect=_local_shell_argv)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.controller.close)
+    
+    def test_output_and_status(self):
+        """Test that output and exit status are framed by the sentinel."""
+        self.assertEqual(self.controller._shell_exec("dev", "echo hi; false"), (b"hi\n", 1))
+        self.assertEqual(self.controller._shell_exec("dev", "printf x"), (b"x", 0))
+    
+    def test_stdin_and_comments(self):
+        """Test that reading stdin or a trailing comment cannot hide the sentinel."""
+        self.assertEqual(
+            self.controller._shell_exec("dev", "read x; echo done # note", timeout=5),
+            (b"done\n", 0)
+        )
+        self.assertEqual(self.controller._shell_exec("dev", "echo next"), (b"next\n", 0))
+    
+    def test_unbalanced_quote_falls_back(self):
+        """Test that a command that cannot be framed runs once in a one-off shell."""
+        with patch('nexuscontroller.controller.subprocess.run') as mock_run:
+            mock_run.return_value = MagicMock(stdout=b"")
+            self.controller._run_adb_shell_bytes("dev", "echo 'oops")
+            mock_run.assert_called_once()
+    
+    def test_dead_session_is_not_retried(self):
+        """Test that a command that killed the session is not run a second time."""
+        with patch('nexuscontroller.controller.subprocess.run') as mock_run:
+            with self.assertRaises(subprocess.SubprocessError):
+                self.controller._run_adb_shell_bytes("dev", "exit 3")
+            mock_run.assert_not_called()
+        self.assertEqual(self.controller._shell_exec("dev", "echo again"), (b"again\n", 0))
+    
+    def test_timeout_propagates(self):
+        """Test that a hung command raises TimeoutExpired and the session recovers."""
+        with self.assertRaises(subprocess.TimeoutExpired):
+            self.controller._shell_exec("dev", "while :; do :; done", timeout=0.3)
+        with patch.object(self.controller, "_shell_exec",
+                          side_effect=subprocess.TimeoutExpired("cmd", 1)):
+            with self.assertRaises(subprocess.TimeoutExpired):
+                self.controller._run_adb_shell_bytes("dev", "cmd")
+        self.assertEqual(self.controller._shell_exec("dev", "echo ok"), (b"ok\n", 0))
+    
+    def test_empty_device_info_not_cached(self):
+        """Test that a device that did not answer is queried again next time."""
+        with patch.object(self.controller, "_run_adb_shell_bytes", return_value=b"") as mock_shell:
+            self.controller.get_device_info("dev")
+            self.controller.get_device_info("dev")
+            self.assertEqual(mock_shell.call_count, 2)
+
+_DEVICE_INFO_OUTPUT = (
+    b"Pixel 7\n---\nGoogle\n---\n14\n---\n34\n---\n"
+    b"Current Battery Service state:\n  status: 2\n  level: 87\n---\n"
+    b"Physical size: 1080x2400\n---\n"
+    b"3: wlan0: <UP>\n    inet 192.168.1.20/24 brd 192.168.1.255 scope global wlan0\n"
+)
+
+class TestDeviceInfo(unittest.TestCase):
+    """Test parsing of the batched device info output."""
+    
+    def setUp(self):
+        self.controller = AndroidController()
+    
+    def test_sections_parsed(self):
+        """Test that each `---` separated section lands in its field."""
+        with patch.object(self.controller, "_run_adb_shell_bytes",
+                          return_value=_DEVICE_INFO_OUTPUT) as mock_shell:
+            info = self.controller.get_device_info("dev")
+            self.assertEqual(info, {
+                "model": "Pixel 7",
+                "manufacturer": "Google",
+                "android_version": "14",
+                "api_level": "34",
+                "battery_level": "87",
+                "battery_status": "Charging",
+                "screen_resolution": "1080x2400",
+                "ip_address": "192.168.1.20",
+            })
+            # One shell round trip, then answered devices are served from the cache
+            self.assertIs(self.controller.get_device_info("dev"), info)
+            mock_shell.assert_called_once()
+    
+    def test_missing_sections(self):
+        """Test that a truncated reply fills the remaining fields with defaults."""
+        with patch.object(self.controller, "_run_adb_shell_bytes", return_value=b"Pixel 7\n"):
+            info = self.controller.get_device_info("dev")
+        self.assertEqual(info["model"], "Pixel 7")
+        self.assertEqual(info["api_level"], "")
+        self.assertEqual(info["battery_level"], "Unknown")
+        self.assertEqual(info["screen_resolution"], "Unknown")
+    
+    def test_crlf_output(self):
+        """Test that CRLF output from a pty-backed shell is split the same way."""
+        output = _DEVICE_INFO_OUTPUT.replace(b"\n", b"\r\n")
+        with patch.object(self.controller, "_run_adb_shell_bytes", return_value=output):
+            info = self.controller.get_device_info("dev")
+        self.assertEqual(info["model"], "Pixel 7")
+        self.assertEqual(info["api_level"], "34")
+        self.assertEqual(info["battery_level"], "87")
+        self.assertEqual(info["screen_resolution"], "1080x2400")
+        self.assertEqual(info["ip_address"], "192.168.1.20")
+
+class TestMaestroFlow(unittest.TestCase):
+    """Test building and running Maestro flows."""
+    
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        patcher = patch('nexuscontroller.controller.MAESTRO_FLOWS_DIR', self.tmp)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.controller = AndroidController()
+        self.controller.current_maestro_flow_file = os.path.join(self.tmp, "current_flow.yaml")
+        self.addCleanup(self.controller.close)
+    
+    def test_set_flow_survives_first_use(self):
+        """Test that a flow assigned on a fresh controller is kept and run."""
+        self.controller.maestro_flow = "appId: com.example\n---\n"
+        self.controller.append_to_maestro_flow("- launchApp\n")
+        self.assertEqual(self.controller.maestro_flow, "appId: com.example\n---\n- launchApp\n")
+        
+        with patch('nexuscontroller.controller.subprocess.run') as mock_run:
+            mock_run.return_value = MagicMock(returncode=0)
+            self.assertTrue(self.controller.maestro_run_flow("emulator-5554"))
+            with open(mock_run.call_args[0][0][2]) as f:
+                self.assertEqual(f.read(), self.controller.maestro_flow)
+    
+    def test_first_append_creates_flow_file(self):
+        """Test that the lazy setup writes the flow file without clearing the flow."""
+        self.controller.append_to_maestro_flow("- back\n")
+        self.assertEqual(self.controller.maestro_flow, "- back\n")
+        self.assertTrue(os.path.exists(self.controller.current_maestro_flow_file))
+
+class TestScreenCapture(unittest.TestCase):
+    """Test that failed captures do not leave files behind."""
+    
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.controller = AndroidController()
+        self.addCleanup(self.controller.close)
+    
+    def test_screenshot_names(self):
+        """Test that default names carry the current date and skip existing files."""
+        cwd = os.getcwd()
+        os.chdir(self.tmp)
+        self.addCleanup(os.chdir, cwd)
+        open("screenshot_dev_20261016_000001.png", "wb").close()
+        
+        with patch('nexuscontroller.controller.date') as mock_date:
+            mock_date.today.return_value = date(2026, 10, 16)
+            self.assertEqual(self.controller._next_screenshot_path("dev"), "screenshot_dev_20261016_000000.png")
+            self.assertEqual(self.controller._next_screenshot_path("dev"), "screenshot_dev_20261016_000002.png")
+            
+            # The date part follows the day while the counter keeps increasing
+            mock_date.today.return_value = date(2026, 10, 17)
+            self.assertEqual(self.controller._next_screenshot_path("dev"), "screenshot_dev_20261017_000003.png")
+    
+    def test_screenshot(self):
+        """Test that only PNG data from screencap is saved."""
+        path = os.path.join(self.tmp, "shot.png")
+        with patch.object(self.controller, "exec_out", return_value=b"") as mock_exec:
+            with self.assertRaises(subprocess.SubprocessError):
+                self.controller.take_screenshot("dev", path)
+            mock_exec.assert_called_once_with("dev", "screencap -p")
+        self.assertFalse(os.path.exists(path))
+        
+        png = b"\x89PNG\r\n\x1a\n" + b"data"
+        with patch.object(self.controller, "exec_out", return_value=png):
+            self.assertEqual(self.controller.take_screenshot("dev", path), path)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), png)
+    
+    @unittest.skipUnless(shutil.which("sh"), "needs a POSIX shell")
+    def test_recording_fetch(self):
+        """Test that a missing recording is reported and its empty file removed."""
+        path = os.path.join(self.tmp, "rec.mp4")
+        with patch.object(self.controller, "_adb_argv", side_effect=_local_shell_argv):
+            self.assertEqual(self.controller._fetch_recording("dev", "/nonexistent/rec.mp4", path), "")
+            self.assertFalse(os.path.exists(path))
+            
+            device_path = os.path.join(self.tmp, "device.mp4")
+            with open(device_path, "wb") as f:
+                f.write(b"mp4data")
+            self.assertEqual(self.controller._fetch_recording("dev", device_path, path), path)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"mp4data")
+        self.assertFalse(os.path.exists(device_path))
+
+_MAESTRO_OUTPUT = (
+    "Running on emulator-5554\n"
+    "appId: com.example.app\n"
+    "Screenshot saved to {shot}\n"
+    "Screenshot saved to /nonexistent/missing.png\n"
+    "appId: com.other.app\n"
+)
+
+class TestGenerateReport(unittest.TestCase):
+    """Test the Maestro report generator against fake Maestro output."""
+    
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.shot = os.path.join(self.tmp, "home.png")
+        open(self.shot, "wb").close()
+    
+    def test_scan_output(self):
+        """Test that screenshots are collected and the first appId wins."""
+        screenshots = []
+        app_package = generate_report._scan_output(_MAESTRO_OUTPUT.format(shot=self.shot), screenshots)
+        self.assertEqual(app_package, "com.example.app")
+        self.assertEqual(screenshots, [self.shot, "/nonexistent/missing.png"])
+    
+    def test_parse_test_results(self):
+        """Test both streamed and captured results, dropping missing screenshots."""
+        streamed = {
+            "flow_file": "flows/login.yaml", "success": False, "duration": 1.5,
+            "screenshots": [self.shot, "/nonexistent/missing.png"], "app_package": None,
+            "error": "warn\nError: element not found\nAssertion Failed: title\n",
+        }
+        captured = {
+            "flow_file": "flows/home.yaml", "success": True, "duration": 0.5,
+            "output": _MAESTRO_OUTPUT.format(shot=self.shot), "error": "",
+        }
+        parsed = generate_report.parse_test_results([streamed, captured])
+        self.assertEqual(parsed[0]["app_package"], "Unknown")
+        self.assertEqual(parsed[0]["screenshots"], [self.shot])
+        self.assertEqual(parsed[0]["errors"], ["Error: element not found", "Assertion Failed: title"])
+        self.assertEqual(parsed[1]["app_package"], "com.example.app")
+        self.assertEqual(parsed[1]["screenshots"], [self.shot])
+        self.assertEqual(parsed[1]["errors"], [])
+    
+    @unittest.skipUnless(shutil.which("sh"), "needs a POSIX shell")
+    def test_run_maestro_test_streams(self):
+        """Test that output is parsed while Maestro runs."""
+        script = f"printf '%s' '{_MAESTRO_OUTPUT.format(shot=self.shot)}'; echo 'Error: flow failed' >&2; exit 1"
+        popen = subprocess.Popen
+        with patch('generate_report.subprocess.Popen',
+                   side_effect=lambda cmd, **kwargs: popen(["sh", "-c", script], **kwargs)) as mock_popen:
+            result = generate_report.run_maestro_test("flows/login.yaml", "emulator-5554")
+        self.assertEqual(mock_popen.call_args[0][0],
+                         ["maestro", "test", "flows/login.yaml", "--device", "emulator-5554"])
+        self.assertFalse(result["success"])
+        self.assertEqual(result["app_package"], "com.example.app")
+        self.assertEqual(result["screenshots"], [self.shot, "/nonexistent/missing.png"])
+        self.assertEqual(result["error"], "Error: flow failed\n")
+    
+    def test_run_maestro_tests_sharding(self):
+        """Test that flows are split across devices and reported in their original order."""
+        flows = [f"flows/{i}.yaml" for i in range(5)]
+        
+        def fake_run(flow_file, device_id=None):
+            return {"flow_file": flow_file, "device": device_id}
+        
+        with patch('generate_report.run_maestro_test', side_effect=fake_run):
+            results = generate_report.run_maestro_tests(flows, ["a", "b"])
+            self.assertEqual([r["flow_file"] for r in results], flows)
+            self.assertEqual([r["device"] for r in results], ["a", "b", "a", "b", "a"])
+            
+            results = generate_report.run_maestro_tests(flows[:2], [])
+            self.assertEqual([r["device"] for r in results], [None, None])
+    
+    def test_results_cache(self):
+        """Test that cached results are reused only while newer than every flow."""
+        flow = os.path.join(self.tmp, "login.yaml")
+        open(flow, "w").close()
+        cache_file = os.path.join(self.tmp, "reports", generate_report.RESULTS_CACHE_FILE)
+        parsed = [{"flow_file": flow, "success": True, "screenshots": [], "errors": []}]
+        
+        self.assertIsNone(generate_report.load_cached_results(cache_file, [flow]))
+        generate_report.save_results(parsed, cache_file)
+        os.utime(flow, (0, 0))
+        self.assertEqual(generate_report.load_cached_results(cache_file, [flow]), parsed)
+        
+        # A flow edited after the run invalidates the cache
+        later = os.stat(cache_file).st_mtime + 10
+        os.utime(flow, (later, later))
+        self.assertIsNone(generate_report.load_cached_results(cache_file, [flow]))
+
+_UI_DUMP = b"""<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<hierarchy rotation="0">
+  <node text="" resource-id="" content-desc="" bounds="[0,0][1080,2400]">
+    <node text="Sign in" resource-id="com.example:id/login" content-desc="" bounds="[100,200][300,400]" />
+    <node text="" resource-id="" content-desc="Back" bounds="[0,0][50,50]">
+      <node text="Hidden" resource-id="" content-desc="" bounds="" />
+    </node>
+    <node text="" resource-id="com.example:id/list" content-desc="" bounds="[0,500][1080,2000]" />
+  </node>
+</hierarchy>
+"""
+
+class TestMcpServer(unittest.TestCase):
+    """Test MCP server tools with a fake controller."""
+    
+    def setUp(self):
+        patcher = patch.object(server, "android_mcp", MagicMock())
+        self.android_mcp = patcher.start()
+        self.addCleanup(patcher.stop)
+        for name, value in (("current_device", None), ("_screen_sizes", {}), ("_packages_cache", {})):
+            patcher = patch.object(server, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def test_use_device_screen_size(self):
+        """Test that the size is prefetched once and kept until the device is gone."""
+        self.android_mcp.get_devices.return_value = ["a", "b"]
+        self.android_mcp._run_adb_shell_command.side_effect = lambda device_id, command: (
+            "Physical size: 1080x2400" if device_id == "a" else "Physical size: 720x1280"
+        )
+        for device in ("a", "b", "a", "b"):
+            self.assertTrue(server.use_device(device))
+        self.assertEqual(server.current_device, "b")
+        self.assertEqual(server._screen_sizes, {"a": (1080, 2400), "b": (720, 1280)})
+        self.assertEqual(self.android_mcp._run_adb_shell_command.call_count, 2)
+        
+        self.android_mcp.get_devices.return_value = ["b"]
+        server.use_device("b")
+        self.assertEqual(server._screen_sizes, {"b": (720, 1280)})
+    
+    def test_list_apps_cache(self):
+        """Test that package lists are cached for the TTL, but empty ones are not."""
+        self.android_mcp.list_packages.side_effect = [[], ["com.a"], ["com.a", "com.b"], ["com.c"]]
+        with patch('nexuscontroller.mcp.server.time.monotonic', return_value=100.0) as mock_clock:
+            self.assertEqual(server.list_apps(device="dev"), [])
+            self.assertEqual(server.list_apps(device="dev"), ["com.a"])
+            self.assertEqual(server.list_apps(device="dev"), ["com.a"])
+            self.assertEqual(server.list_apps(refresh=True, device="dev"), ["com.a", "com.b"])
+            mock_clock.return_value = 100.0 + server._PACKAGES_TTL
+            self.assertEqual(server.list_apps(device="dev"), ["com.c"])
+        self.assertEqual(self.android_mcp.list_packages.call_count, 4)
+    
+    def test_type_keys(self):
+        """Test that typing goes through the controller's quoting."""
+        self.assertTrue(server.type_keys("hi $USER", submit=True, device="dev"))
+        self.android_mcp.send_text.assert_called_once_with("dev", "hi $USER", submit=True)
+    
+    def test_parse_ui_elements(self):
+        """Test that labelled, bounded nodes are kept in order and parsed nodes are released."""
+        iterparse = server.etree.iterparse
+        seen = []
+        
+        def recording_iterparse(*args, **kwargs):
+            for event, elem in iterparse(*args, **kwargs):
+                seen.append(elem)
+                yield event, elem
+        
+        with patch.object(server.etree, "iterparse", side_effect=recording_iterparse):
+            elements = server._parse_ui_elements(io.BytesIO(_UI_DUMP))
+        self.assertEqual(elements, [
+            {"id": "com.example:id/login", "text": "Sign in", "bounds": [200, 300]},
+            {"id": "", "text": "Back", "bounds": [25, 25]},
+            {"id": "com.example:id/list", "text": "", "bounds": [540, 1250]},
+        ])
+        # Every parsed node was detached, so the root holds nothing
+        self.assertEqual(len(seen[0]), 0)
+    
+    def test_batch_actions(self):
+        """Test that a batch is one chained command whose timeout includes the sleeps."""
+        ops = [
+            {"action": "tap", "x": 10, "y": 20},
+            {"action": "sleep", "seconds": 2},
+            {"action": "key", "keycode": 4},
+            {"action": "text", "text": "hi there"},
+        ]
+        self.assertTrue(server.batch_actions(ops, device="dev"))
+        self.android_mcp._run_adb_shell_checked.assert_called_once_with(
+            "dev",
+            "input tap 10 20 && sleep 2.0 && input keyevent 4 && input text hi%sthere",
+            timeout=server.ADB_TIMEOUT + 2.0
+        )
+    
+    def test_batch_actions_failures(self):
+        """Test that invalid ops send nothing and device failures are raised."""
+        with self.assertRaises(Exception):
+            server.batch_actions([{"action": "tap", "x": 1, "y": 1}, {"action": "fly"}], device="dev")
+        self.android_mcp._run_adb_shell_checked.assert_not_called()
+        
+        self.android_mcp._run_adb_shell_checked.side_effect = subprocess.CalledProcessError(1, "input")
+        with self.assertRaises(Exception):
+            server.batch_actions([{"action": "key", "keycode": 3}], device="dev")
+    
+    def test_swipe_explicit_coordinates(self):
+        """Test that explicit coordinates skip the size lookup and must be integers."""
+        self.assertTrue(server.swipe_on_screen(x1="10", y1=20, x2=30.0, y2=40, duration="150", device="dev"))
+        self.android_mcp.swipe_screen.assert_called_once_with("dev", 10, 20, 30, 40, 150)
+        self.android_mcp._run_adb_shell_command.assert_not_called()
+        
+        for bad in ({"x1": "1; reboot", "y1": 2, "x2": 3, "y2": 4}, {"x1": 1, "y1": 2}):
+            with self.assertRaises(Exception):
+                server.swipe_on_screen(device="dev", **bad)
+        with self.assertRaises(Exception):
+            server.swipe_on_screen(x1=1, y1=2, x2=3, y2=4, duration="$(reboot)", device="dev")
+        self.android_mcp.swipe_screen.assert_called_once()
+    
+    def test_package_name_validation(self):
+        """Test that malformed package names never reach adb."""
+        for tool in (server.launch_app, server.terminate_app):
+            with self.assertRaises(Exception):
+                tool("com.example; reboot", device="dev")
+        self.android_mcp.launch_app.assert_not_called()
+        self.android_mcp._run_adb_shell_bytes.assert_not_called()
+        
+        self.assertTrue(server.terminate_app("com.example.app_2", device="dev"))
+        self.android_mcp._run_adb_shell_bytes.assert_called_once_with("dev", "am force-stop com.example.app_2")
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file